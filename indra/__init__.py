@@ -8,11 +8,27 @@ Designed for simplicity and demonstration purposes.
 __version__ = "0.1.0"
 __author__ = "Mehul - Five Labs"
 
-from .queen import Queen
-from .router import Router
-from .compiler import Compiler
+import importlib
 from .base_worker import BaseWorker, register_worker, WORKER_REGISTRY
 
+# Imported on first access so `import indra` (and CLI commands like
+# `indra status`) don't pay for the OpenAI client stack
+_LAZY_EXPORTS = {
+    "Queen": ".queen",
+    "Router": ".router",
+    "Compiler": ".compiler",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
 __all__ = [
     "Queen",
     "Router", 
@@ -5,35 +5,45 @@ Provides the foundation for all specialized workers with automatic registration
 and standardized task processing.
 """
 
-import json
 import os
 import logging
+import functools
+import time
+from types import MappingProxyType
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Type
-from datetime import datetime
+from typing import Dict, Any, Mapping, Optional, Type
+from .cache import ResultCache, cache_key
+from . import wire
+from .paths import DEFAULT_RESULTS_DIR
+from .utils import append_record, atomic_write_bytes, ensure_dir, utc_isoformat
 
-# Global worker registry
-WORKER_REGISTRY: Dict[str, Type['BaseWorker']] = {}
+# Global worker registry. Only register_worker and unregister_worker write;
+# WORKER_REGISTRY is a read-only view.
+_registry: Dict[str, Type['BaseWorker']] = {}
+WORKER_REGISTRY: Mapping[str, Type['BaseWorker']] = MappingProxyType(_registry)
 
 logger = logging.getLogger(__name__)
 
 
-def register_worker(name: str):
+def register_worker(name: str, cacheable: bool = False):
     """
     Decorator for automatic worker registration.
     
     Args:
         name: Unique identifier for the worker
+        cacheable: Memoize execute() outputs by inputs. Only enable for
+            deterministic workers (not ones calling live APIs or clocks).
         
     Raises:
         ValueError: If worker name already exists in registry
     """
     def decorator(cls):
-        if name in WORKER_REGISTRY:
+        # Single dict operation: inserts if new, returns the incumbent otherwise
+        if _registry.setdefault(name, cls) is not cls:
             raise ValueError(f"Worker '{name}' already registered. Choose a unique name.")
         
-        WORKER_REGISTRY[name] = cls
-        logger.info(f"Registered worker: {name}")
+        cls.cacheable = cacheable
+        logger.info("Registered worker: %s", name)
         return cls
     
     return decorator
@@ -47,7 +57,25 @@ class BaseWorker(ABC):
     All workers must inherit from this class and implement the execute method.
     """
     
-    def __init__(self, worker_name: str, results_dir: str = "results"):
+    # Memoization of execute() outputs; enabled per worker via register_worker
+    cacheable: bool = False
+    cache = ResultCache()
+    
+    # Scheduling hints for indra.pool: "thread" for I/O-bound workers,
+    # "process" for CPU-bound ones; optional cap on concurrent tasks
+    executor: str = "thread"
+    max_concurrency: Optional[int] = None
+    
+    # Workers whose execute() finishes in a few milliseconds can skip the
+    # transient IN_PROGRESS rewrite; the task file goes straight to DONE
+    fast_path: bool = False
+    
+    # One instance per (worker name, results dir) is reused for every task in
+    # a process, so __init__ runs once. Set False for workers that keep
+    # per-task state on self, since a shared instance runs tasks concurrently
+    reuse_instance: bool = True
+    
+    def __init__(self, worker_name: str, results_dir: str = DEFAULT_RESULTS_DIR):
         """
         Initialize the worker.
         
@@ -77,6 +105,48 @@ class BaseWorker(ABC):
         """
         raise NotImplementedError("Subclasses must implement the execute method")
     
+    def process_task(self, task_data: Dict[str, Any], started_at: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Execute a task payload in memory.
+        
+        Used directly by the in-process dispatch path; no files are touched.
+        
+        Args:
+            task_data: Task payload with at least 'id' and optional 'inputs'
+            started_at: Wall-clock start (time.time()) if the caller already read it
+            
+        Returns:
+            Result payload with task_id, worker, outputs and timing data
+        """
+        task_id = task_data['id']
+        inputs = task_data.get('inputs', {})
+        
+        self.logger.info("Processing task %s", task_id)
+        
+        if started_at is None:
+            started_at = time.time()
+        start_ns = time.monotonic_ns()
+        if self.cacheable:
+            key = cache_key(self.worker_name, inputs)
+            outputs = self.cache.get(key)
+            if outputs is None:
+                outputs = self.execute(**inputs)
+                self.cache.put(key, outputs)
+            else:
+                self.logger.info("Cache hit for task %s", task_id)
+        else:
+            outputs = self.execute(**inputs)
+        # Monotonic for the duration; the completion stamp is derived from it
+        execution_time = (time.monotonic_ns() - start_ns) / 1e9
+        
+        return {
+            'task_id': task_id,
+            'worker': self.worker_name,
+            'outputs': outputs,
+            'execution_time': execution_time,
+            'timestamp': utc_isoformat(started_at + execution_time)
+        }
+    
     def process_task_file(self, task_file_path: str) -> None:
         """
         Standard task processing workflow.
@@ -84,78 +154,63 @@ class BaseWorker(ABC):
         Reads task file, executes the task, and writes results.
         
         Args:
-            task_file_path: Path to the task JSON file
+            task_file_path: Path to the task file
             
         Raises:
             FileNotFoundError: If task file doesn't exist
-            json.JSONDecodeError: If task file contains invalid JSON
+            wire.DecodeError: If task file cannot be decoded
             Exception: If task execution fails
         """
         try:
             # Read and parse task file
-            with open(task_file_path, 'r') as f:
-                task_data = json.load(f)
+            with open(task_file_path, 'rb') as f:
+                task_data = wire.decode(f.read())
             
             task_id = task_data['id']
-            inputs = task_data.get('inputs', {})
-            
-            self.logger.info(f"Processing task {task_id}")
             
             # Update task status to IN_PROGRESS
+            started_at = time.time()
             task_data['status'] = 'IN_PROGRESS'
-            task_data['started_at'] = datetime.utcnow().isoformat()
-            
-            with open(task_file_path, 'w') as f:
-                json.dump(task_data, f, indent=2)
+            task_data['started_at'] = utc_isoformat(started_at)
+            if not self.fast_path:
+                atomic_write_bytes(task_file_path, wire.encode(task_data))
             
             # Execute the task
-            start_time = datetime.utcnow()
-            outputs = self.execute(**inputs)
-            end_time = datetime.utcnow()
-            
-            # Create result data
-            result_data = {
-                'task_id': task_id,
-                'worker': self.worker_name,
-                'outputs': outputs,
-                'execution_time': (end_time - start_time).total_seconds(),
-                'timestamp': end_time.isoformat()
-            }
+            result_data = self.process_task(task_data, started_at)
             
             # Write result to results directory
-            os.makedirs(self.results_dir, exist_ok=True)
-            result_path = os.path.join(self.results_dir, f"{task_id}_result.json")
-            
-            with open(result_path, 'w') as f:
-                json.dump(result_data, f, indent=2)
+            ensure_dir(self.results_dir)
+            if wire.RESULTS_LOG:
+                result_path = os.path.join(self.results_dir, wire.RESULTS_LOG_NAME)
+                append_record(result_path, wire.encode(result_data) + b"\n")
+            else:
+                result_path = os.path.join(self.results_dir, f"{task_id}_result{wire.SUFFIX}")
+                atomic_write_bytes(result_path, wire.encode(result_data))
             
             # Update task status to DONE
             task_data['status'] = 'DONE'
-            task_data['completed_at'] = end_time.isoformat()
+            task_data['completed_at'] = result_data['timestamp']
             task_data['result_path'] = result_path
+            atomic_write_bytes(task_file_path, wire.encode(task_data))
             
-            with open(task_file_path, 'w') as f:
-                json.dump(task_data, f, indent=2)
-            
-            self.logger.info(f"Task {task_id} completed successfully")
+            self.logger.info("Task %s completed successfully", task_id)
             
         except FileNotFoundError:
-            self.logger.error(f"Task file not found: {task_file_path}")
+            self.logger.error("Task file not found: %s", task_file_path)
             raise
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Invalid JSON in task file {task_file_path}: {e}")
+        except wire.DecodeError as e:
+            self.logger.error("Invalid task file %s: %s", task_file_path, e)
             raise
         except Exception as e:
-            self.logger.error(f"Task execution failed: {e}")
+            self.logger.error("Task execution failed: %s", e)
             # Update task status to ERROR
             try:
-                with open(task_file_path, 'r') as f:
-                    task_data = json.load(f)
+                with open(task_file_path, 'rb') as f:
+                    task_data = wire.decode(f.read())
                 task_data['status'] = 'ERROR'
                 task_data['error'] = str(e)
-                task_data['failed_at'] = datetime.utcnow().isoformat()
-                with open(task_file_path, 'w') as f:
-                    json.dump(task_data, f, indent=2)
+                task_data['failed_at'] = utc_isoformat(time.time())
+                atomic_write_bytes(task_file_path, wire.encode(task_data))
             except:
                 pass  # Don't fail on error logging
             raise
@@ -177,11 +232,45 @@ def get_worker_class(worker_name: str) -> Type[BaseWorker]:
     # Ensure workers are imported
     _import_workers()
     
-    if worker_name not in WORKER_REGISTRY:
+    try:
+        return WORKER_REGISTRY[worker_name]
+    except KeyError:
         available_workers = list(WORKER_REGISTRY.keys())
-        raise KeyError(f"Worker '{worker_name}' not found. Available workers: {available_workers}")
+        raise KeyError(f"Worker '{worker_name}' not found. Available workers: {available_workers}") from None
+
+
+def get_worker(worker_class: Type[BaseWorker], worker_name: str,
+               results_dir: str = DEFAULT_RESULTS_DIR) -> BaseWorker:
+    """
+    Get a worker instance to run a task with.
     
-    return WORKER_REGISTRY[worker_name]
+    Args:
+        worker_class: Registered worker class
+        worker_name: Name the worker was registered under
+        results_dir: Directory where the worker writes result files
+        
+    Returns:
+        The process-wide shared instance, or a fresh one if the class opts
+        out via reuse_instance
+    """
+    if not worker_class.reuse_instance:
+        return worker_class(worker_name, results_dir)
+    return _shared_worker(worker_class, worker_name, results_dir)
+
+
+@functools.lru_cache(maxsize=None)
+def _shared_worker(worker_class: Type[BaseWorker], worker_name: str, results_dir: str) -> BaseWorker:
+    return worker_class(worker_name, results_dir)
+
+
+def unregister_worker(name: str) -> None:
+    """
+    Remove a worker from the registry, e.g. one a test registered.
+    
+    Args:
+        name: Name the worker was registered under
+    """
+    _registry.pop(name, None)
 
 
 def list_available_workers() -> list[str]:
@@ -196,8 +285,9 @@ def list_available_workers() -> list[str]:
     return list(WORKER_REGISTRY.keys())
 
 
+@functools.lru_cache(maxsize=None)
 def _import_workers():
-    """Import all workers to trigger registration."""
+    """Import all workers to trigger registration (runs once per process)."""
     try:
         from . import workers
     except ImportError:
@@ -5,12 +5,14 @@ Implements the mini-DSL described in the research paper for hierarchical task pl
 with dependency resolution, budget constraints, and validation.
 """
 
-import json
-import uuid
-from typing import Dict, List, Any, Optional, Set
+import operator
+import sys
+from typing import Dict, List, Any, Optional, Set, Tuple, Union
+import orjson
+from collections import deque
 from dataclasses import dataclass, field
+from graphlib import CycleError, TopologicalSorter
 from enum import Enum
-from pydantic import BaseModel, Field, validator
 
 
 class TaskStatus(str, Enum):
@@ -23,7 +25,11 @@ class TaskStatus(str, Enum):
     SKIPPED = "SKIPPED"  # Skipped due to dependency failure
 
 
-@dataclass
+# Statuses a task can still leave by being skipped; built once for O(1) membership tests
+_SKIPPABLE_STATUSES = frozenset({TaskStatus.PENDING, TaskStatus.READY})
+
+
+@dataclass(slots=True)
 class BeeScriptTask:
     """Enhanced task definition with dependencies and constraints."""
     id: str
@@ -37,11 +43,12 @@ class BeeScriptTask:
     status: TaskStatus = TaskStatus.PENDING
     actual_cost: int = 0  # Actual cost incurred
     retry_count: int = 0  # Current retry count
+    remaining_deps: int = 0  # Dependencies not yet completed (derived from statuses by the executor)
     error_message: Optional[str] = None
     result: Optional[Dict[str, Any]] = None
 
 
-@dataclass 
+@dataclass(slots=True)
 class BeeScript:
     """Complete BeeScript workflow definition."""
     goal: str
@@ -54,6 +61,105 @@ class BeeScript:
     status: str = "PENDING"
     start_time: Optional[float] = None
     end_time: Optional[float] = None
+    
+    # id -> task lookup and id -> dependent ids, rebuilt lazily when subtasks change
+    _index: Dict[str, BeeScriptTask] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _rev_deps: Dict[str, List[str]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # IDs whose dependencies just became satisfied; None until the executor initializes counters
+    _ready_ids: Optional[Dict[str, None]] = field(default=None, init=False, repr=False, compare=False)
+    # COMPLETED task IDs already subtracted from their dependents' counters
+    _released: Set[str] = field(default_factory=set, init=False, repr=False, compare=False)
+
+
+def _topological_batches(tasks: List[BeeScriptTask]) -> List[List[str]]:
+    """
+    Group task IDs into batches that can run in parallel, in dependency order.
+    
+    Each task appears in the first batch after all of its dependencies, and
+    tasks within a batch keep their order in the script. Dependencies on
+    unknown IDs are ignored.
+    
+    Raises:
+        graphlib.CycleError: If the dependencies form a cycle; args[1] holds
+            the task IDs along it
+    """
+    position = {task.id: i for i, task in enumerate(tasks)}
+    sorter = TopologicalSorter()
+    for task in tasks:
+        sorter.add(task.id, *(dep for dep in task.after if dep in position))
+    sorter.prepare()
+    
+    batches = []
+    while sorter.is_active():
+        batch = sorted(sorter.get_ready(), key=position.__getitem__)
+        batches.append(batch)
+        sorter.done(*batch)
+    
+    return batches
+
+
+def _has_cycle(tasks: List[BeeScriptTask]) -> bool:
+    """
+    Check for a dependency cycle without building batches.
+    
+    Task IDs are renumbered to dense ints so the Kahn sweep runs over plain
+    lists (CSR-style child lists and an indegree array) instead of dicts;
+    several times faster than _topological_batches on large plans.
+    """
+    index = {task.id: i for i, task in enumerate(tasks)}
+    count = len(index)
+    indegree = [0] * count
+    children: List[List[int]] = [[] for _ in range(count)]
+    for task in tasks:
+        node = index[task.id]
+        for dep in task.after:
+            parent = index.get(dep)
+            if parent is not None:
+                children[parent].append(node)
+                indegree[node] += 1
+    
+    stack = [node for node in range(count) if not indegree[node]]
+    emitted = 0
+    while stack:
+        node = stack.pop()
+        emitted += 1
+        for child in children[node]:
+            indegree[child] -= 1
+            if not indegree[child]:
+                stack.append(child)
+    
+    return emitted != count
+
+
+def break_cycles(tasks: List[BeeScriptTask]) -> List[Tuple[str, str]]:
+    """
+    Drop dependencies until the task graph is acyclic (task IDs must be unique).
+    
+    Each cycle loses one edge: the dependency that points furthest ahead in
+    the script (a task waiting on a later one is the likeliest mistake). An
+    acyclic graph costs a single _has_cycle sweep.
+    
+    Returns:
+        (task ID, dropped dependency ID) pairs, in the order they were dropped
+    """
+    dropped: List[Tuple[str, str]] = []
+    if not _has_cycle(tasks):
+        return dropped
+    
+    by_id = {task.id: task for task in tasks}
+    position = {task.id: i for i, task in enumerate(tasks)}
+    while True:
+        try:
+            _topological_batches(tasks)
+            return dropped
+        except CycleError as e:
+            # graphlib lists the cycle along dependency edges: each ID is in
+            # the `after` of the one that follows it
+            cycle = e.args[1]
+            dep, task_id = max(zip(cycle, cycle[1:]), key=lambda edge: position[edge[0]] - position[edge[1]])
+            task = by_id[task_id]
+            task.after = [d for d in task.after if d != dep]
+            dropped.append((task_id, dep))
 
 
 class BeeScriptValidator:
@@ -64,7 +170,11 @@ class BeeScriptValidator:
         self.warnings: List[str] = []
     
     def validate(self, script: BeeScript) -> bool:
-        """Validate a complete BeeScript workflow."""
+        """Validate a complete BeeScript workflow.
+        
+        All problems are collected in self.errors in one pass rather than
+        stopping at the first invalid task.
+        """
         self.errors.clear()
         self.warnings.clear()
         
@@ -78,25 +188,32 @@ class BeeScriptValidator:
         if not script.subtasks:
             self.errors.append("At least one subtask is required")
         
-        # Task validation
+        # Task validation, collecting IDs and the cost total in the same pass
         task_ids = set()
+        total_estimated_cost = 0
+        tasks_ok = True
         for task in script.subtasks:
             if not self._validate_task(task, task_ids):
-                return False
-            task_ids.add(task.id)
+                tasks_ok = False
+            if isinstance(task.id, str):
+                task_ids.add(task.id)
+            total_estimated_cost += task.cost_estimate
         
         # Dependency validation
-        if not self._validate_dependencies(script.subtasks):
-            return False
+        self._validate_graph(script.subtasks, task_ids, check_cycles=tasks_ok)
         
         # Budget validation
-        if not self._validate_budget(script):
-            return False
+        self._validate_budget(script, total_estimated_cost)
         
         return len(self.errors) == 0
     
-    def _validate_task(self, task: BeeScriptTask, existing_ids: Set[str]) -> bool:
-        """Validate individual task."""
+    def _validate_task(self, task: BeeScriptTask, existing_ids: set) -> bool:
+        """Validate individual task, recording every problem found."""
+        # Without a usable, unique ID the remaining messages would be ambiguous
+        if task.id and not isinstance(task.id, str):
+            self.errors.append(f"Task ID must be a string, got {task.id!r}")
+            return False
+        
         if not task.id or not task.id.strip():
             self.errors.append("Task ID cannot be empty")
             return False
@@ -105,80 +222,53 @@ class BeeScriptValidator:
             self.errors.append(f"Duplicate task ID: {task.id}")
             return False
         
-        if not task.agent or not task.agent.strip():
+        error_count = len(self.errors)
+        
+        if task.agent and not isinstance(task.agent, str):
+            self.errors.append(f"Task {task.id}: Agent must be a string")
+        elif not task.agent or not task.agent.strip():
             self.errors.append(f"Task {task.id}: Agent cannot be empty")
-            return False
         
-        if not task.task or not task.task.strip():
+        if task.task and not isinstance(task.task, str):
+            self.errors.append(f"Task {task.id}: Task type must be a string")
+        elif not task.task or not task.task.strip():
             self.errors.append(f"Task {task.id}: Task type cannot be empty")
-            return False
         
         if task.cost_estimate <= 0:
             self.errors.append(f"Task {task.id}: Cost estimate must be positive")
-            return False
         
         if task.retry_max < 0:
             self.errors.append(f"Task {task.id}: Retry max cannot be negative")
-            return False
         
         if task.timeout_seconds <= 0:
             self.errors.append(f"Task {task.id}: Timeout must be positive")
-            return False
         
-        return True
+        return len(self.errors) == error_count
     
-    def _validate_dependencies(self, tasks: List[BeeScriptTask]) -> bool:
-        """Validate task dependencies for cycles and missing references."""
-        task_ids = {task.id for task in tasks}
+    def _validate_graph(self, tasks: List[BeeScriptTask], task_ids: set, check_cycles: bool = True) -> bool:
+        """Validate task dependencies for missing references and cycles.
         
-        # Check for missing dependencies
+        The cycle check needs well-formed, unique IDs, so callers skip it
+        when task validation already failed.
+        """
+        error_count = len(self.errors)
         for task in tasks:
             for dep in task.after:
                 if dep not in task_ids:
                     self.errors.append(f"Task {task.id}: Unknown dependency '{dep}'")
-                    return False
-        
-        # Check for circular dependencies using DFS
-        if self._has_circular_dependencies(tasks):
-            self.errors.append("Circular dependency detected in task graph")
-            return False
-        
-        return True
-    
-    def _has_circular_dependencies(self, tasks: List[BeeScriptTask]) -> bool:
-        """Detect circular dependencies using DFS."""
-        # Build adjacency list
-        graph = {task.id: task.after for task in tasks}
-        
-        # Track visit states: 0=unvisited, 1=visiting, 2=visited
-        state = {task_id: 0 for task_id in graph}
         
-        def dfs(node: str) -> bool:
-            if state[node] == 1:  # Currently visiting - cycle detected
-                return True
-            if state[node] == 2:  # Already visited
-                return False
-            
-            state[node] = 1  # Mark as visiting
-            
-            for neighbor in graph[node]:
-                if dfs(neighbor):
-                    return True
-            
-            state[node] = 2  # Mark as visited
-            return False
+        if check_cycles and _has_cycle(tasks):
+            # Slow path only on failure: graphlib reports the nodes on the cycle
+            try:
+                _topological_batches(tasks)
+            except CycleError as e:
+                cycle = " -> ".join(e.args[1])
+                self.errors.append(f"Circular dependency detected in task graph: {cycle}")
         
-        # Check each unvisited node
-        for node in graph:
-            if state[node] == 0 and dfs(node):
-                return True
-        
-        return False
+        return len(self.errors) == error_count
     
-    def _validate_budget(self, script: BeeScript) -> bool:
+    def _validate_budget(self, script: BeeScript, total_estimated_cost: int) -> bool:
         """Validate budget constraints."""
-        total_estimated_cost = sum(task.cost_estimate for task in script.subtasks)
-        
         if total_estimated_cost > script.budget_credits:
             self.errors.append(
                 f"Estimated cost ({total_estimated_cost}) exceeds budget ({script.budget_credits})"
@@ -199,53 +289,57 @@ class BeeScriptExecutor:
         self.validator = BeeScriptValidator()
     
     def get_ready_tasks(self, script: BeeScript) -> List[BeeScriptTask]:
-        """Get tasks that are ready to execute (dependencies satisfied)."""
-        ready_tasks = []
+        """Get tasks that are ready to execute (dependencies satisfied).
+        
+        Only tasks released since the last call are examined: completions
+        decrement their dependents' remaining_deps counters and queue the
+        ones that reach zero.
+        
+        Readiness follows task.status. mark_task_completed releases
+        dependents straight away; a task set to COMPLETED directly is picked
+        up here by a sweep over statuses (one comparison per task).
+        """
+        if script._ready_ids is None or len(script._index) != len(script.subtasks):
+            self._init_dependency_counters(script)
+        else:
+            for task in script.subtasks:
+                if task.status == TaskStatus.COMPLETED and task.id not in script._released:
+                    self._release_dependents(script, task.id)
         
-        for task in script.subtasks:
-            if task.status != TaskStatus.PENDING:
-                continue
-            
-            # Check if all dependencies are completed
-            dependencies_satisfied = True
-            for dep_id in task.after:
-                dep_task = self._find_task_by_id(script, dep_id)
-                if not dep_task or dep_task.status != TaskStatus.COMPLETED:
-                    dependencies_satisfied = False
-                    break
-            
-            if dependencies_satisfied:
+        ready_ids = script._ready_ids
+        ready_tasks = []
+        for task_id in ready_ids:
+            task = self._find_task_by_id(script, task_id)
+            if task and task.status == TaskStatus.PENDING and task.remaining_deps == 0:
                 task.status = TaskStatus.READY
                 ready_tasks.append(task)
+        ready_ids.clear()
         
         return ready_tasks
     
+    def _init_dependency_counters(self, script: BeeScript) -> None:
+        """Count each task's incomplete dependencies and queue those with none."""
+        self._rebuild_index(script)
+        script._ready_ids = {}
+        script._released = {task.id for task in script.subtasks if task.status == TaskStatus.COMPLETED}
+        for task in script.subtasks:
+            task.remaining_deps = sum(
+                1 for dep_id in task.after
+                if dep_id not in script._index or script._index[dep_id].status != TaskStatus.COMPLETED
+            )
+            if task.remaining_deps == 0 and task.status == TaskStatus.PENDING:
+                script._ready_ids[task.id] = None
+    
     def get_execution_order(self, script: BeeScript) -> List[List[str]]:
         """Get optimal execution order as list of parallel batches."""
         if not self.validator.validate(script):
             raise ValueError(f"Invalid BeeScript: {self.validator.errors}")
         
-        # Topological sort with parallel batches
-        batches = []
-        remaining_tasks = {task.id: task for task in script.subtasks}
-        
-        while remaining_tasks:
-            # Find tasks with no remaining dependencies
-            ready_batch = []
-            for task_id, task in remaining_tasks.items():
-                if all(dep not in remaining_tasks for dep in task.after):
-                    ready_batch.append(task_id)
-            
-            if not ready_batch:
-                raise ValueError("Circular dependency detected")
-            
-            batches.append(ready_batch)
-            
-            # Remove completed tasks
-            for task_id in ready_batch:
-                del remaining_tasks[task_id]
-        
-        return batches
+        # Topological sort with parallel batches, touching each edge once
+        try:
+            return _topological_batches(script.subtasks)
+        except CycleError as e:
+            raise ValueError(f"Circular dependency detected: {' -> '.join(e.args[1])}") from None
     
     def can_execute_task(self, script: BeeScript, task: BeeScriptTask) -> bool:
         """Check if a task can be executed given current state."""
@@ -270,11 +364,22 @@ class BeeScriptExecutor:
         """Mark a task as completed and update script state."""
         task = self._find_task_by_id(script, task_id)
         if task:
+            if script._ready_ids is not None and task_id not in script._released:
+                self._release_dependents(script, task_id)
             task.status = TaskStatus.COMPLETED
             task.result = result
             task.actual_cost = actual_cost
             script.total_cost += actual_cost
     
+    def _release_dependents(self, script: BeeScript, task_id: str) -> None:
+        """Count a completion against its dependents, queueing those left with none."""
+        script._released.add(task_id)
+        for child_id in script._rev_deps.get(task_id, ()):
+            child = script._index[child_id]
+            child.remaining_deps -= 1
+            if child.remaining_deps == 0:
+                script._ready_ids[child_id] = None
+    
     def mark_task_failed(self, script: BeeScript, task_id: str, 
                         error: str, actual_cost: int = 0) -> None:
         """Mark a task as failed and update script state."""
@@ -291,36 +396,72 @@ class BeeScriptExecutor:
                 self._mark_dependents_skipped(script, task_id)
             else:
                 task.status = TaskStatus.PENDING  # Ready for retry
+                if script._ready_ids is not None and task.remaining_deps == 0:
+                    script._ready_ids[task_id] = None
     
     def _find_task_by_id(self, script: BeeScript, task_id: str) -> Optional[BeeScriptTask]:
         """Find task by ID in script."""
-        for task in script.subtasks:
-            if task.id == task_id:
-                return task
-        return None
+        task = script._index.get(task_id)
+        if task is None or task.id != task_id or len(script._index) != len(script.subtasks):
+            # Subtasks were added, removed or renamed since the index was built
+            self._rebuild_index(script)
+            task = script._index.get(task_id)
+        return task
+    
+    def _rebuild_index(self, script: BeeScript) -> None:
+        """Rebuild the script's id index and reverse-dependency map.
+        
+        The dependency counters are dropped too, so the next get_ready_tasks
+        recounts them from the current subtasks and statuses.
+        """
+        script._ready_ids = None
+        script._index = {t.id: t for t in script.subtasks}
+        rev_deps: Dict[str, List[str]] = {}
+        for t in script.subtasks:
+            for dep in t.after:
+                rev_deps.setdefault(dep, []).append(t.id)
+        script._rev_deps = rev_deps
     
     def _mark_dependents_skipped(self, script: BeeScript, failed_task_id: str) -> None:
         """Mark all dependent tasks as skipped when a dependency fails."""
-        def mark_skipped(task_id: str):
-            for task in script.subtasks:
-                if failed_task_id in task.after and task.status in [TaskStatus.PENDING, TaskStatus.READY]:
-                    task.status = TaskStatus.SKIPPED
-                    mark_skipped(task.id)  # Recursively skip dependents
-        
-        mark_skipped(failed_task_id)
+        # Ensures the reverse-dependency map is current
+        self._find_task_by_id(script, failed_task_id)
+        
+        # Breadth-first over dependents; each task is skipped (and expanded) once
+        queue = deque([failed_task_id])
+        while queue:
+            task_id = queue.popleft()
+            for child_id in script._rev_deps.get(task_id, ()):
+                child = script._index[child_id]
+                if child.status in _SKIPPABLE_STATUSES:
+                    child.status = TaskStatus.SKIPPED
+                    queue.append(child_id)
+
 
+def _intern(value: Any) -> Any:
+    """Intern string IDs; anything else (e.g. a null id) is left for the validator."""
+    return sys.intern(value) if isinstance(value, str) else value
 
-def parse_beescript(data: Dict[str, Any]) -> BeeScript:
-    """Parse BeeScript from dictionary/JSON data."""
-    # Parse subtasks
+
+def parse_beescript(data: Union[Dict[str, Any], str, bytes]) -> BeeScript:
+    """Parse BeeScript from dictionary/JSON data.
+    
+    Raw JSON (str or bytes) is decoded with orjson; malformed input raises
+    orjson.JSONDecodeError, a json.JSONDecodeError subclass.
+    """
+    if isinstance(data, (str, bytes)):
+        data = orjson.loads(data)
+    
+    # Parse subtasks. IDs are interned so the many id-keyed lookups in
+    # validation and scheduling compare by identity before comparing text.
     subtasks = []
     for task_data in data.get('subtasks', []):
         task = BeeScriptTask(
-            id=task_data['id'],
+            id=_intern(task_data['id']),
             agent=task_data['agent'],
             task=task_data['task'],
             params=task_data.get('params', {}),
-            after=task_data.get('after', []),
+            after=[_intern(dep) for dep in task_data.get('after', [])],
             cost_estimate=task_data.get('cost_estimate', 10),
             retry_max=task_data.get('retry_max', 2),
             timeout_seconds=task_data.get('timeout_seconds', 30)
@@ -338,30 +479,35 @@ def parse_beescript(data: Dict[str, Any]) -> BeeScript:
     return script
 
 
+_COST_ESTIMATE = operator.attrgetter('cost_estimate')
+
+
+def total_cost_estimate(tasks: List[BeeScriptTask]) -> int:
+    """Sum the tasks' cost estimates (iterates in C via map/attrgetter)."""
+    return sum(map(_COST_ESTIMATE, tasks))
+
+
+# Serialized BeeScriptTask fields, read in one C-level attrgetter call per task
+_TASK_KEYS = (
+    'id', 'agent', 'task', 'params', 'after', 'cost_estimate', 'retry_max',
+    'timeout_seconds', 'status', 'actual_cost', 'retry_count', 'error_message', 'result'
+)
+_TASK_FIELDS = operator.attrgetter(*_TASK_KEYS)
+
+
+def _task_to_dict(task: BeeScriptTask) -> Dict[str, Any]:
+    data = dict(zip(_TASK_KEYS, _TASK_FIELDS(task)))
+    data['status'] = task.status.value
+    return data
+
+
 def beescript_to_dict(script: BeeScript) -> Dict[str, Any]:
     """Convert BeeScript to dictionary for serialization."""
     return {
         'goal': script.goal,
         'budget_credits': script.budget_credits,
         'timeout_minutes': script.timeout_minutes,
-        'subtasks': [
-            {
-                'id': task.id,
-                'agent': task.agent,
-                'task': task.task,
-                'params': task.params,
-                'after': task.after,
-                'cost_estimate': task.cost_estimate,
-                'retry_max': task.retry_max,
-                'timeout_seconds': task.timeout_seconds,
-                'status': task.status.value,
-                'actual_cost': task.actual_cost,
-                'retry_count': task.retry_count,
-                'error_message': task.error_message,
-                'result': task.result
-            }
-            for task in script.subtasks
-        ],
+        'subtasks': [_task_to_dict(task) for task in script.subtasks],
         'total_cost': script.total_cost,
         'status': script.status,
         'start_time': script.start_time,
@@ -0,0 +1,63 @@
+"""Content-addressed cache for deterministic worker outputs."""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import orjson
+from typing import Any, Dict, Optional
+from .paths import RUNTIME_DIR
+
+DEFAULT_CACHE_DIR = os.path.join(RUNTIME_DIR, "cache")
+
+
+def cache_key(worker_name: str, inputs: Dict[str, Any]) -> str:
+    """Hash a worker name and its canonicalized inputs into a cache key."""
+    canonical = orjson.dumps(inputs, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(worker_name.encode())
+    digest.update(b"\0")
+    digest.update(canonical)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Memo of worker outputs shared by every worker process.
+    
+    Entries live in a single SQLite database in WAL mode, so concurrent
+    readers never block and all processes see each other's hits.
+    """
+    
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or os.getenv("INDRA_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.db_path = os.path.join(self.cache_dir, "memo.sqlite3")
+        self._local = threading.local()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS memo (key TEXT PRIMARY KEY, outputs BLOB NOT NULL)")
+            self._local.conn = conn
+        return conn
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get cached outputs for a key, or None on a miss."""
+        try:
+            row = self._connect().execute("SELECT outputs FROM memo WHERE key = ?", (key,)).fetchone()
+            return orjson.loads(row[0]) if row else None
+        except (OSError, sqlite3.Error, orjson.JSONDecodeError):
+            return None
+    
+    def put(self, key: str, outputs: Dict[str, Any]) -> None:
+        """Store outputs under a key. Cache write failures are not fatal."""
+        try:
+            data = orjson.dumps(outputs, option=orjson.OPT_NON_STR_KEYS)
+            self._connect().execute("INSERT OR REPLACE INTO memo (key, outputs) VALUES (?, ?)", (key, data))
+        except (OSError, sqlite3.Error, orjson.JSONEncodeError):
+            pass
@@ -2,16 +2,21 @@
 
 import sys
 import argparse
+import orjson
 from pathlib import Path
-from openai import OpenAI
-from .queen import Queen
-from .router import Router
-from .compiler import Compiler
+from . import wire
+from .paths import DEFAULT_QUEUE_DIR, DEFAULT_RESULTS_DIR
 from .utils import setup_logging, ensure_directories, get_api_key
 
 
-def run_workflow(prompt: str, output_dir: str = "results") -> bool:
+def run_workflow(prompt: str, output_dir: str = "results", pretty: bool = False) -> bool:
     """Execute the complete Indra workflow."""
+    # Heavy imports (OpenAI client stack) are only paid by the run command
+    from openai import OpenAI
+    from .queen import Queen
+    from .router import Router
+    from .compiler import Compiler
+    
     try:
         # Validate inputs
         if not prompt or not prompt.strip():
@@ -36,7 +41,7 @@ def run_workflow(prompt: str, output_dir: str = "results") -> bool:
             client = OpenAI(api_key=api_key)
             queen = Queen(client)
             router = Router()
-            compiler = Compiler(results_dir=output_dir)
+            compiler = Compiler()
         except Exception as e:
             print(f"❌ Failed to initialize components: {e}")
             return False
@@ -72,12 +77,16 @@ def run_workflow(prompt: str, output_dir: str = "results") -> bool:
         except Exception as e:
             print(f"❌ Task execution failed: {e}")
             return False
+        finally:
+            router.close()  # stops the queue watcher thread, if any
         
         # Step 4: Compile results
         try:
             compiled_data = compiler.compile_results(task_ids)
             output_path = Path(output_dir) / "result.json"
-            final_output = compiler.generate_final_output(compiled_data, prompt, str(output_path))
+            final_output = compiler.generate_final_output(
+                compiled_data, prompt, str(output_path), pretty=pretty
+            )
             
             print(f"✅ Results saved to {output_path}")
             print(f"📋 Completed {final_output['tasks_completed']} tasks")
@@ -95,6 +104,49 @@ def run_workflow(prompt: str, output_dir: str = "results") -> bool:
         return False
 
 
+def _pretty_json(data) -> str:
+    """Render decoded task/result data as indented JSON for display."""
+    return orjson.dumps(
+        data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+    ).decode()
+
+
+def dump_task(task_id: str) -> bool:
+    """Print a task's queue and result files as readable JSON."""
+    paths = [
+        Path(DEFAULT_QUEUE_DIR) / f"{task_id}{wire.SUFFIX}",
+        Path(DEFAULT_RESULTS_DIR) / f"{task_id}_result{wire.SUFFIX}"
+    ]
+    
+    found = False
+    for path in paths:
+        if not path.exists():
+            continue
+        try:
+            with open(path, 'rb') as f:
+                data = wire.decode(f.read())
+        except (wire.DecodeError, OSError) as e:
+            print(f"❌ Could not read {path}: {e}")
+            continue
+        
+        print(f"# {path}")
+        print(_pretty_json(data))
+        found = True
+    
+    if wire.RESULTS_LOG:
+        from .compiler import read_results_log
+        
+        data = read_results_log(DEFAULT_RESULTS_DIR, [task_id]).get(task_id)
+        if data is not None:
+            print(f"# {Path(DEFAULT_RESULTS_DIR) / wire.RESULTS_LOG_NAME}")
+            print(_pretty_json(data))
+            found = True
+    
+    if not found:
+        print(f"❌ No task files found for {task_id}")
+    return found
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(description="Indra MVP - AI Agent Orchestration")
@@ -104,19 +156,27 @@ def main():
     run_parser = subparsers.add_parser("run")
     run_parser.add_argument("prompt", help="User prompt to process")
     run_parser.add_argument("--out", default="results", help="Output directory")
+    run_parser.add_argument("--pretty", action="store_true", help="Indent the result JSON")
     
     # Status command
     subparsers.add_parser("status")
     
+    # Dump command
+    dump_parser = subparsers.add_parser("dump")
+    dump_parser.add_argument("task_id", help="Task ID to print queue/result files for")
+    
     args = parser.parse_args()
     
     if args.command == "run":
-        success = run_workflow(args.prompt, args.out)
+        success = run_workflow(args.prompt, args.out, args.pretty)
         sys.exit(0 if success else 1)
     elif args.command == "status":
         api_key = get_api_key()
         print("✅ API Key: Configured" if api_key else "❌ API Key: Missing")
         print("✅ System: Ready")
+    elif args.command == "dump":
+        success = dump_task(args.task_id)
+        sys.exit(0 if success else 1)
     else:
         parser.print_help()
 
@@ -1,18 +1,59 @@
 """Compiler - Result aggregation."""
 
-import json
-from typing import List, Dict, Any
+import os
+import mmap
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
 from pathlib import Path
+from pydantic import TypeAdapter
 from .models import WorkerResult
+from . import wire
+from .dispatch import CompletedQueue
+from .paths import DEFAULT_RESULTS_DIR
+from .utils import ensure_dir, read_file_bytes
+
+
+# Serializes the whole result list in one call instead of one model_dump per result
+_RESULT_LIST = TypeAdapter(List[WorkerResult])
+
+
+def read_results_log(results_dir: str, task_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Read results for task_ids from the NDJSON results log (later entries win)."""
+    wanted = set(task_ids)
+    found: Dict[str, Dict[str, Any]] = {}
+    log_path = Path(results_dir) / wire.RESULTS_LOG_NAME
+    try:
+        with open(log_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return found
+            # One sequential pass over the mapped file; the OS handles readahead
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as log:
+                for line in iter(log.readline, b""):
+                    try:
+                        result_data = wire.decode(line)
+                    except wire.DecodeError:
+                        # Torn final record from an interrupted worker
+                        continue
+                    task_id = result_data.get('task_id')
+                    if task_id in wanted:
+                        found[task_id] = result_data
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Error reading results log {log_path}: {e}")
+    return found
 
 
 class Compiler:
     """Aggregates worker results into final output."""
     
-    def __init__(self, results_dir: str = "results", timeout: int = 30):
+    def __init__(self, results_dir: str = DEFAULT_RESULTS_DIR, timeout: int = 30,
+                 completed: Optional[CompletedQueue] = None):
         self.results_dir = Path(results_dir)
         self.timeout = timeout
-        self.results_dir.mkdir(exist_ok=True)
+        self.completed = completed
+        ensure_dir(self.results_dir)
     
     def compile_results(self, task_ids: List[str]) -> Dict[str, Any]:
         """Compile all worker results."""
@@ -25,19 +66,33 @@ class Compiler:
                 "total_tasks": 0
             }
         
+        found: Dict[str, WorkerResult] = {}
+        on_disk = []
         for task_id in task_ids:
-            try:
-                result_file = self.results_dir / f"{task_id}_result.json"
-                if result_file.exists():
-                    with open(result_file, 'r') as f:
-                        result_data = json.load(f)
-                    
-                    # Validate result data before creating WorkerResult
-                    if all(key in result_data for key in ['task_id', 'worker', 'outputs']):
-                        results.append(WorkerResult(**result_data))
-            except (json.JSONDecodeError, TypeError, ValueError, OSError) as e:
-                print(f"Error reading result for task {task_id}: {e}")
-                continue
+            # Results from an in-memory Router never hit the disk
+            if self.completed is not None:
+                result_data = self.completed.get(task_id)
+                if result_data is not None:
+                    found[task_id] = WorkerResult.model_validate(result_data)
+                    continue
+            on_disk.append(task_id)
+        
+        if on_disk and wire.RESULTS_LOG:
+            for task_id, result_data in read_results_log(self.results_dir, on_disk).items():
+                if all(key in result_data for key in ['task_id', 'worker', 'outputs']):
+                    found[task_id] = WorkerResult.model_validate(result_data)
+        elif on_disk:
+            # One directory listing instead of a stat per task, then decode in parallel
+            result_files = self._find_result_files(on_disk)
+            if result_files:
+                with ThreadPoolExecutor(max_workers=min(32, len(result_files))) as executor:
+                    loaded = executor.map(self._load_result, result_files.keys(), result_files.values())
+                    for task_id, result in zip(result_files.keys(), loaded):
+                        if result is not None:
+                            found[task_id] = result
+        
+        # Keep results in the order the tasks were requested
+        results = [found[task_id] for task_id in task_ids if task_id in found]
         
         return {
             "results": results,
@@ -45,16 +100,51 @@ class Compiler:
             "total_tasks": len(task_ids)
         }
     
+    def _find_result_files(self, task_ids: List[str]) -> Dict[str, str]:
+        """Map task IDs to their result file paths with a single scandir pass."""
+        wanted = {f"{task_id}_result{wire.SUFFIX}": task_id for task_id in task_ids}
+        result_files = {}
+        try:
+            with os.scandir(self.results_dir) as entries:
+                for entry in entries:
+                    task_id = wanted.get(entry.name)
+                    if task_id is not None:
+                        result_files[task_id] = entry.path
+        except OSError as e:
+            print(f"Error listing results directory {self.results_dir}: {e}")
+        return result_files
+    
+    def _load_result(self, task_id: str, path: str) -> Optional[WorkerResult]:
+        """Decode one result file, returning None if it is unreadable or incomplete."""
+        try:
+            raw = read_file_bytes(path)
+            
+            if wire.WIRE_FORMAT == "json":
+                # Parse and validate in a single pass; missing fields raise ValidationError
+                return WorkerResult.model_validate_json(raw)
+            
+            result_data = wire.decode(raw)
+            
+            # Validate result data before creating WorkerResult
+            if all(key in result_data for key in ['task_id', 'worker', 'outputs']):
+                return WorkerResult.model_validate(result_data)
+        except (wire.DecodeError, TypeError, ValueError, OSError) as e:
+            print(f"Error reading result for task {task_id}: {e}")
+        return None
+    
     def generate_final_output(self, compiled_data: Dict[str, Any], 
-                            original_prompt: str, output_path: str) -> Dict[str, Any]:
-        """Generate final output file."""
+                            original_prompt: str, output_path: str,
+                            pretty: bool = False) -> Dict[str, Any]:
+        """Generate final output file (compact JSON unless pretty is set)."""
         final_output = {
             "prompt": original_prompt,
             "tasks_completed": compiled_data["completed_tasks"],
-            "results": [r.dict() for r in compiled_data["results"]]
+            "results": _RESULT_LIST.dump_python(compiled_data["results"], mode='json')
         }
         
-        with open(output_path, 'w') as f:
-            json.dump(final_output, f, indent=2)
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        Path(output_path).write_bytes(orjson.dumps(final_output, option=option))
         
         return final_output
\ No newline at end of file
@@ -5,10 +5,13 @@ Implements a simple credit-based system for tracking resource usage
 and enforcing budget constraints during workflow execution.
 """
 
+import functools
+import sys
 import time
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from dataclasses import dataclass, field
 from enum import Enum
+from types import MappingProxyType
 
 
 class TransactionType(str, Enum):
@@ -21,7 +24,7 @@ class TransactionType(str, Enum):
     REFUND = "refund"
 
 
-@dataclass
+@dataclass(slots=True)
 class CreditTransaction:
     """Individual credit transaction record."""
     transaction_id: str
@@ -35,7 +38,7 @@ class CreditTransaction:
     metadata: Dict[str, str] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class CreditAccount:
     """Credit account for a workflow session."""
     session_id: str
@@ -45,6 +48,19 @@ class CreditAccount:
     transactions: List[CreditTransaction] = field(default_factory=list)
     created_at: float = field(default_factory=time.time)
     last_activity: float = field(default_factory=time.time)
+    
+    # Running aggregates over charges, kept in sync by CreditManager so
+    # summaries don't rescan the transaction list
+    _spending_by_agent: Dict[str, int] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _spending_by_task: Dict[str, int] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _spending_by_type: Dict[TransactionType, int] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _total_charges: int = field(default=0, init=False, repr=False, compare=False)
+    _total_refunds: int = field(default=0, init=False, repr=False, compare=False)
+
+
+def _intern(value: Any) -> Any:
+    """Intern string IDs; anything else (e.g. None or an int ID) is kept as is."""
+    return sys.intern(value) if isinstance(value, str) else value
 
 
 class CreditManager:
@@ -59,6 +75,8 @@ class CreditManager:
         if initial_budget <= 0:
             raise ValueError("Initial budget must be positive")
         
+        # Interned: the same session/agent/task strings recur on every transaction
+        session_id = _intern(session_id)
         account = CreditAccount(
             session_id=session_id,
             initial_budget=initial_budget,
@@ -82,8 +100,13 @@ class CreditManager:
     def charge_credits(self, session_id: str, amount: int, 
                       transaction_type: TransactionType, description: str,
                       task_id: Optional[str] = None, agent: Optional[str] = None,
-                      metadata: Optional[Dict[str, str]] = None) -> bool:
-        """Charge credits from an account."""
+                      metadata: Optional[Dict[str, str]] = None,
+                      now: Optional[float] = None) -> bool:
+        """Charge credits from an account.
+        
+        Callers recording many charges at once can pass a shared `now`
+        timestamp instead of reading the clock per transaction.
+        """
         account = self.get_account(session_id)
         if not account:
             return False
@@ -94,16 +117,22 @@ class CreditManager:
         if account.current_balance < amount:
             return False  # Insufficient funds
         
+        if now is None:
+            now = time.time()
+        agent = _intern(agent)
+        task_id = _intern(task_id)
+        
         # Create transaction
         self.transaction_counter += 1
         transaction = CreditTransaction(
             transaction_id=f"tx-{self.transaction_counter:06d}",
-            session_id=session_id,
+            session_id=account.session_id,
             transaction_type=transaction_type,
             amount=amount,
             description=description,
             task_id=task_id,
             agent=agent,
+            timestamp=now,
             metadata=metadata or {}
         )
         
@@ -111,13 +140,22 @@ class CreditManager:
         account.current_balance -= amount
         account.total_spent += amount
         account.transactions.append(transaction)
-        account.last_activity = time.time()
+        account.last_activity = now
+        
+        account._total_charges += amount
+        by_type = account._spending_by_type
+        by_type[transaction_type] = by_type.get(transaction_type, 0) + amount
+        if agent:
+            account._spending_by_agent[agent] = account._spending_by_agent.get(agent, 0) + amount
+        if task_id:
+            account._spending_by_task[task_id] = account._spending_by_task.get(task_id, 0) + amount
         
         return True
     
     def refund_credits(self, session_id: str, amount: int, description: str,
-                      task_id: Optional[str] = None, agent: Optional[str] = None) -> bool:
-        """Refund credits to an account."""
+                      task_id: Optional[str] = None, agent: Optional[str] = None,
+                      now: Optional[float] = None) -> bool:
+        """Refund credits to an account (see charge_credits for `now`)."""
         account = self.get_account(session_id)
         if not account:
             return False
@@ -130,23 +168,31 @@ class CreditManager:
         if refund_amount <= 0:
             return False
         
+        if now is None:
+            now = time.time()
+        agent = _intern(agent)
+        task_id = _intern(task_id)
+        
         # Create refund transaction
         self.transaction_counter += 1
         transaction = CreditTransaction(
             transaction_id=f"tx-{self.transaction_counter:06d}",
-            session_id=session_id,
+            session_id=account.session_id,
             transaction_type=TransactionType.REFUND,
             amount=-refund_amount,  # Negative for refunds
             description=description,
             task_id=task_id,
-            agent=agent
+            agent=agent,
+            timestamp=now
         )
         
         # Update account
         account.current_balance += refund_amount
         account.total_spent -= refund_amount
         account.transactions.append(transaction)
-        account.last_activity = time.time()
+        account.last_activity = now
+        # Refunds are tracked separately; the spending breakdowns count charges only
+        account._total_refunds += refund_amount
         
         return True
     
@@ -169,12 +215,7 @@ class CreditManager:
         if not account:
             return {}
         
-        spending = {}
-        for transaction in account.transactions:
-            if transaction.amount > 0 and transaction.agent:  # Only charges, not refunds
-                spending[transaction.agent] = spending.get(transaction.agent, 0) + transaction.amount
-        
-        return spending
+        return dict(account._spending_by_agent)
     
     def get_spending_by_task(self, session_id: str) -> Dict[str, int]:
         """Get spending breakdown by task."""
@@ -182,12 +223,7 @@ class CreditManager:
         if not account:
             return {}
         
-        spending = {}
-        for transaction in account.transactions:
-            if transaction.amount > 0 and transaction.task_id:  # Only charges, not refunds
-                spending[transaction.task_id] = spending.get(transaction.task_id, 0) + transaction.amount
-        
-        return spending
+        return dict(account._spending_by_task)
     
     def get_transaction_history(self, session_id: str, 
                                limit: Optional[int] = None) -> List[CreditTransaction]:
@@ -196,45 +232,42 @@ class CreditManager:
         if not account:
             return []
         
-        transactions = sorted(account.transactions, key=lambda t: t.timestamp, reverse=True)
-        
+        # Transactions are appended as they happen, so append order is
+        # chronological order; newest first is just the reversed tail
+        transactions = account.transactions
         if limit:
-            transactions = transactions[:limit]
-        
-        return transactions
+            return transactions[:-limit - 1:-1]
+        return transactions[::-1]
     
     def get_account_summary(self, session_id: str) -> Optional[Dict[str, any]]:
-        """Get comprehensive account summary."""
+        """Get comprehensive account summary.
+        
+        Totals and breakdowns come from the running aggregates kept by
+        charge_credits/refund_credits, so this is O(1) in the number of
+        transactions.
+        """
         account = self.get_account(session_id)
         if not account:
             return None
         
-        # Calculate statistics
-        total_transactions = len(account.transactions)
-        charges = sum(t.amount for t in account.transactions if t.amount > 0)
-        refunds = sum(-t.amount for t in account.transactions if t.amount < 0)
-        
-        # Get spending by type
-        spending_by_type = {}
-        for transaction in account.transactions:
-            if transaction.amount > 0:
-                tx_type = transaction.transaction_type.value
-                spending_by_type[tx_type] = spending_by_type.get(tx_type, 0) + transaction.amount
-        
+        now = time.time()
         return {
             "session_id": account.session_id,
             "initial_budget": account.initial_budget,
             "current_balance": account.current_balance,
             "total_spent": account.total_spent,
             "budget_utilization": (account.total_spent / account.initial_budget) * 100,
-            "total_transactions": total_transactions,
-            "total_charges": charges,
-            "total_refunds": refunds,
-            "spending_by_type": spending_by_type,
-            "spending_by_agent": self.get_spending_by_agent(session_id),
-            "spending_by_task": self.get_spending_by_task(session_id),
-            "account_age_seconds": time.time() - account.created_at,
-            "last_activity_seconds_ago": time.time() - account.last_activity
+            "total_transactions": len(account.transactions),
+            "total_charges": account._total_charges,
+            "total_refunds": account._total_refunds,
+            # Keyed by member internally; .value only for the returned copy
+            "spending_by_type": {
+                tx_type.value: amount for tx_type, amount in account._spending_by_type.items()
+            },
+            "spending_by_agent": dict(account._spending_by_agent),
+            "spending_by_task": dict(account._spending_by_task),
+            "account_age_seconds": now - account.created_at,
+            "last_activity_seconds_ago": now - account.last_activity
         }
     
     def cleanup_old_accounts(self, max_age_hours: int = 24) -> int:
@@ -254,35 +287,43 @@ class CreditManager:
         return cleaned_count
 
 
-# Cost estimation functions
+# Cost estimation tables, built once at import rather than per call
+
+# Base costs by agent type
+_BASE_COSTS = MappingProxyType({
+    "travel": 15,
+    "finance": 12,
+    "compiler": 8,
+    "queen": 25
+})
+
+# Adjust based on task complexity
+_COMPLEXITY_MULTIPLIERS = MappingProxyType({
+    "find_flights": 1.5,
+    "find_hotels": 1.3,
+    "calculate_trip_cost": 1.2,
+    "travel_planning": 2.0,
+    "compile_results": 1.1
+})
+
+# Exponential backoff multipliers for the retry counts seen in practice
+_RETRY_MULTIPLIERS = tuple(1.5 ** i for i in range(17))
+
+
 def estimate_task_cost(agent: str, task_type: str, params: Dict[str, any]) -> int:
     """Estimate the cost of executing a task."""
-    # Base costs by agent type
-    base_costs = {
-        "travel": 15,
-        "finance": 12,
-        "compiler": 8,
-        "queen": 25
-    }
-    
-    base_cost = base_costs.get(agent, 10)
-    
-    # Adjust based on task complexity
-    complexity_multipliers = {
-        "find_flights": 1.5,
-        "find_hotels": 1.3,
-        "calculate_trip_cost": 1.2,
-        "travel_planning": 2.0,
-        "compile_results": 1.1
-    }
-    
-    multiplier = complexity_multipliers.get(task_type, 1.0)
+    # Only the number of parameters affects the cost, so it's all we cache on
+    param_count = len(params) if isinstance(params, dict) else 0
+    return _estimate_task_cost(agent, task_type, param_count)
+
+
+@functools.lru_cache(maxsize=1024)
+def _estimate_task_cost(agent: str, task_type: str, param_count: int) -> int:
+    base_cost = _BASE_COSTS.get(agent, 10)
+    multiplier = _COMPLEXITY_MULTIPLIERS.get(task_type, 1.0)
     
-    # Adjust based on parameters
-    param_cost = 0
-    if isinstance(params, dict):
-        # More parameters = slightly higher cost
-        param_cost = len(params) * 0.5
+    # More parameters = slightly higher cost
+    param_cost = param_count * 0.5
     
     estimated_cost = int(base_cost * multiplier + param_cost)
     return max(estimated_cost, 1)  # Minimum cost of 1
@@ -291,16 +332,17 @@ def estimate_task_cost(agent: str, task_type: str, params: Dict[str, any]) -> in
 def estimate_retry_cost(base_cost: int, retry_count: int) -> int:
     """Estimate the cost of a retry (typically higher than base cost)."""
     # Exponential backoff for retry costs
-    retry_multiplier = 1.5 ** retry_count
+    if 0 <= retry_count < len(_RETRY_MULTIPLIERS):
+        retry_multiplier = _RETRY_MULTIPLIERS[retry_count]
+    else:
+        retry_multiplier = 1.5 ** retry_count
     return int(base_cost * retry_multiplier)
 
 
 # Global credit manager instance
-_credit_manager = None
+# Built at import: construction is cheap and side-effect free
+_credit_manager = CreditManager()
 
 def get_credit_manager() -> CreditManager:
     """Get the global credit manager instance."""
-    global _credit_manager
-    if _credit_manager is None:
-        _credit_manager = CreditManager()
     return _credit_manager
\ No newline at end of file
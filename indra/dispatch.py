@@ -0,0 +1,91 @@
+"""In-process task queues between Router and workers."""
+
+import queue
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class TodoQueue:
+    """Thread-safe FIFO of task payloads waiting to be executed."""
+    
+    def __init__(self):
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+    
+    def put(self, task_data: Dict[str, Any]) -> None:
+        """Enqueue a task payload."""
+        self._queue.put(task_data)
+    
+    def drain(self) -> List[Dict[str, Any]]:
+        """Remove and return every task payload currently queued."""
+        tasks = []
+        while True:
+            try:
+                tasks.append(self._queue.get_nowait())
+            except queue.Empty:
+                return tasks
+    
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+
+class CompletedQueue:
+    """Thread-safe collection of result payloads keyed by task ID."""
+    
+    def __init__(self):
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+    
+    def put(self, result_data: Dict[str, Any]) -> None:
+        """Record a finished task's result payload."""
+        with self._lock:
+            self._results[result_data['task_id']] = result_data
+    
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get the result payload for a task, if it has completed."""
+        with self._lock:
+            return self._results.get(task_id)
+    
+    def __contains__(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._results
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._results)
+
+
+class TaskGraph:
+    """
+    Dependency bookkeeping for dispatched tasks.
+    
+    Tracks how many unmet dependencies each task has, so a finished task
+    releases exactly the successors that became ready instead of the Router
+    rescanning every task.
+    """
+    
+    def __init__(self):
+        self._unmet: Dict[str, int] = {}
+        self._dependents: Dict[str, List[str]] = defaultdict(list)
+        self._done: set = set()
+    
+    def add(self, task_id: str, after: Iterable[str] = ()) -> bool:
+        """Register a task; returns True if it is ready to run immediately."""
+        unmet = [dep for dep in after if dep not in self._done]
+        self._unmet[task_id] = len(unmet)
+        for dep in unmet:
+            self._dependents[dep].append(task_id)
+        return not unmet
+    
+    def mark_done(self, task_id: str) -> List[str]:
+        """Record a finished task and return the dependents it made ready."""
+        self._done.add(task_id)
+        released = []
+        for child in self._dependents.pop(task_id, ()):
+            self._unmet[child] -= 1
+            if self._unmet[child] == 0:
+                released.append(child)
+        return released
+    
+    def __len__(self) -> int:
+        return len(self._unmet)
@@ -5,16 +5,31 @@ Provides persistent memory across task execution within a workflow session,
 allowing agents to share context and build upon previous results.
 """
 
-import json
+import atexit
+import functools
+import logging
+import operator
+import os
+import pickle
+import queue
+import threading
 import time
-from typing import Dict, Any, Optional, List
+import orjson
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Iterator, Tuple
 from dataclasses import dataclass, field
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+
+@dataclass(slots=True)
 class MemoryEntry:
-    """Individual memory entry with metadata."""
+    """Individual memory entry with metadata.
+    
+    Slotted so entries carry no per-instance __dict__; sessions hold up to
+    max_entries of these.
+    """
     key: str
     value: Any
     timestamp: float
@@ -24,85 +39,111 @@ class MemoryEntry:
     last_accessed: float = field(default_factory=time.time)
 
 
+_ACCESS_COUNT = operator.attrgetter('access_count')
+
+
 class WorkflowMemory:
     """Memory system for a single workflow session."""
     
     def __init__(self, session_id: str, max_entries: int = 1000):
         self.session_id = session_id
         self.max_entries = max_entries
-        self.entries: Dict[str, MemoryEntry] = {}
-        self.created_at = time.time()
-        self.last_accessed = time.time()
+        # Kept in least- to most-recently-used order, so eviction is popitem(last=False)
+        self.entries: "OrderedDict[str, MemoryEntry]" = OrderedDict()
+        # task_id / agent -> keys (dicts used as insertion-ordered sets)
+        self._by_task: Dict[str, Dict[str, None]] = {}
+        self._by_agent: Dict[str, Dict[str, None]] = {}
+        # Sorted key list for list_keys, rebuilt only after the key set changes
+        self._sorted_keys: Optional[List[str]] = None
+        # Set when entries change; cleared once the session is persisted
+        self._dirty = False
+        self.created_at = self.last_accessed = time.time()
     
     def store(self, key: str, value: Any, task_id: Optional[str] = None, 
               agent: Optional[str] = None) -> None:
         """Store a value in memory."""
-        # Evict oldest entries if at capacity
-        if len(self.entries) >= self.max_entries:
+        # Evict oldest entries if at capacity; overwriting a key just refreshes it
+        previous = self.entries.get(key)
+        if previous is not None:
+            self._unindex(previous)
+            self.entries.move_to_end(key)
+        elif len(self.entries) >= self.max_entries:
             self._evict_oldest()
         
+        # One clock read per call, shared by every timestamp it sets
+        now = time.time()
         entry = MemoryEntry(
             key=key,
             value=value,
-            timestamp=time.time(),
+            timestamp=now,
             task_id=task_id,
-            agent=agent
+            agent=agent,
+            last_accessed=now
         )
         
-        self.entries[key] = entry
-        self.last_accessed = time.time()
+        self._add_entry(entry)
+        self._dirty = True
+        self.last_accessed = now
     
     def retrieve(self, key: str) -> Optional[Any]:
         """Retrieve a value from memory."""
         entry = self.entries.get(key)
         if entry:
             entry.access_count += 1
-            entry.last_accessed = time.time()
-            self.last_accessed = time.time()
+            entry.last_accessed = self.last_accessed = time.time()
+            self.entries.move_to_end(key)
             return entry.value
         return None
     
     def get_by_task(self, task_id: str) -> Dict[str, Any]:
         """Get all memory entries created by a specific task."""
-        result = {}
-        for key, entry in self.entries.items():
-            if entry.task_id == task_id:
-                entry.access_count += 1
-                entry.last_accessed = time.time()
-                result[key] = entry.value
-        
-        if result:
-            self.last_accessed = time.time()
-        
-        return result
+        return dict(self.iter_by_task(task_id))
     
     def get_by_agent(self, agent: str) -> Dict[str, Any]:
         """Get all memory entries created by a specific agent."""
-        result = {}
-        for key, entry in self.entries.items():
-            if entry.agent == agent:
-                entry.access_count += 1
-                entry.last_accessed = time.time()
-                result[key] = entry.value
+        return dict(self.iter_by_agent(agent))
+    
+    def iter_by_task(self, task_id: str) -> Iterator[Tuple[str, Any]]:
+        """Yield (key, value) for entries created by a task, without building a dict.
         
-        if result:
-            self.last_accessed = time.time()
+        Don't store or delete entries while iterating.
+        """
+        return self._iter_indexed(self._by_task.get(task_id))
+    
+    def iter_by_agent(self, agent: str) -> Iterator[Tuple[str, Any]]:
+        """Yield (key, value) for entries created by an agent (see iter_by_task)."""
+        return self._iter_indexed(self._by_agent.get(agent))
+    
+    def _iter_indexed(self, keys: Optional[Dict[str, None]]) -> Iterator[Tuple[str, Any]]:
+        """Yield the entries for an index bucket, counting each as an access."""
+        if not keys:
+            return
         
-        return result
+        now = self.last_accessed = time.time()
+        for key in keys:
+            entry = self.entries[key]
+            entry.access_count += 1
+            entry.last_accessed = now
+            self.entries.move_to_end(key)
+            yield key, entry.value
     
     def list_keys(self, pattern: Optional[str] = None) -> List[str]:
         """List all keys, optionally filtered by pattern."""
-        keys = list(self.entries.keys())
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self.entries)
         
         if pattern:
-            keys = [k for k in keys if pattern in k]
+            return [k for k in self._sorted_keys if pattern in k]
         
-        return sorted(keys)
+        return list(self._sorted_keys)
     
     def delete(self, key: str) -> bool:
         """Delete a memory entry."""
-        if key in self.entries:
-            del self.entries[key]
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self._unindex(entry)
+            self._sorted_keys = None
+            self._dirty = True
             self.last_accessed = time.time()
             return True
         return False
@@ -110,29 +151,35 @@ class WorkflowMemory:
     def clear(self) -> None:
         """Clear all memory entries."""
         self.entries.clear()
+        self._sorted_keys = None
+        self._by_task.clear()
+        self._by_agent.clear()
+        self._dirty = True
         self.last_accessed = time.time()
     
     def get_stats(self) -> Dict[str, Any]:
         """Get memory usage statistics."""
+        now = time.time()
         if not self.entries:
             return {
                 "total_entries": 0,
-                "memory_age_seconds": time.time() - self.created_at,
-                "last_accessed_seconds_ago": time.time() - self.last_accessed,
+                "memory_age_seconds": now - self.created_at,
+                "last_accessed_seconds_ago": now - self.last_accessed,
                 "most_accessed_key": None,
                 "agents": [],
                 "tasks": []
             }
         
         # Calculate statistics
-        most_accessed = max(self.entries.values(), key=lambda e: e.access_count)
-        agents = list(set(e.agent for e in self.entries.values() if e.agent))
-        tasks = list(set(e.task_id for e in self.entries.values() if e.task_id))
+        most_accessed = max(self.entries.values(), key=_ACCESS_COUNT)
+        # The indexes already hold exactly the agents/tasks with live entries
+        agents = list(self._by_agent)
+        tasks = list(self._by_task)
         
         return {
             "total_entries": len(self.entries),
-            "memory_age_seconds": time.time() - self.created_at,
-            "last_accessed_seconds_ago": time.time() - self.last_accessed,
+            "memory_age_seconds": now - self.created_at,
+            "last_accessed_seconds_ago": now - self.last_accessed,
             "most_accessed_key": most_accessed.key,
             "most_accessed_count": most_accessed.access_count,
             "agents": agents,
@@ -140,24 +187,67 @@ class WorkflowMemory:
         }
     
     def _evict_oldest(self) -> None:
-        """Evict the oldest entry based on last access time."""
-        if not self.entries:
-            return
-        
-        # Find entry with oldest last_accessed time
-        oldest_key = min(self.entries.keys(), 
-                        key=lambda k: self.entries[k].last_accessed)
-        del self.entries[oldest_key]
+        """Evict the least recently used entry."""
+        if self.entries:
+            _, entry = self.entries.popitem(last=False)
+            self._unindex(entry)
+            self._sorted_keys = None
+    
+    def _add_entry(self, entry: MemoryEntry) -> None:
+        """Insert an entry and record it in the task/agent indexes."""
+        if entry.key not in self.entries:
+            self._sorted_keys = None
+        self.entries[entry.key] = entry
+        if entry.task_id:
+            self._by_task.setdefault(entry.task_id, {})[entry.key] = None
+        if entry.agent:
+            self._by_agent.setdefault(entry.agent, {})[entry.key] = None
+    
+    def _unindex(self, entry: MemoryEntry) -> None:
+        """Drop an entry's key from the task/agent indexes."""
+        for index, group in ((self._by_task, entry.task_id), (self._by_agent, entry.agent)):
+            keys = index.get(group)
+            if keys is not None:
+                keys.pop(entry.key, None)
+                if not keys:
+                    del index[group]
+
+
+# Persistence formats: file suffix per format
+_SESSION_SUFFIXES = {"json": ".json", "pickle": ".pkl"}
 
 
 class MemoryManager:
-    """Manages memory sessions for multiple workflows."""
+    """Manages memory sessions for multiple workflows.
+    
+    Sessions persist as JSON by default. session_format="pickle" is faster and
+    keeps values' Python types (bytes, datetimes, ...) instead of falling back
+    to str(), but loading a pickle can run arbitrary code: only use it when
+    the storage directory is trusted.
+    """
     
-    def __init__(self, storage_dir: str = "memory", max_sessions: int = 100):
+    def __init__(self, storage_dir: str = "memory", max_sessions: int = 100,
+                 session_format: str = "json"):
+        if session_format not in _SESSION_SUFFIXES:
+            raise ValueError(f"Unknown session_format '{session_format}'. Expected 'json' or 'pickle'")
+        
         self.storage_dir = Path(storage_dir)
         self.storage_dir.mkdir(exist_ok=True)
         self.max_sessions = max_sessions
+        self.session_format = session_format
+        self._suffix = _SESSION_SUFFIXES[session_format]
         self.sessions: Dict[str, WorkflowMemory] = {}
+        
+        # Evicted sessions are written by a background thread; _pending_writes
+        # holds the latest bytes per file until they land on disk
+        self._write_queue: "queue.Queue[Path]" = queue.Queue()
+        self._pending_writes: Dict[Path, bytes] = {}
+        self._write_lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        
+        # session_id -> mtime of its persisted file; read from disk once here,
+        # then kept current by our own writes so cleanup needs no directory scan
+        self._persisted_files: Dict[str, float] = self._scan_persisted_files()
     
     def create_session(self, session_id: str) -> WorkflowMemory:
         """Create a new memory session."""
@@ -174,10 +264,17 @@ class MemoryManager:
         return self.sessions.get(session_id)
     
     def get_or_create_session(self, session_id: str) -> WorkflowMemory:
-        """Get existing session or create new one."""
-        session = self.get_session(session_id)
+        """Get existing session or create new one.
+        
+        A hit is a single dict lookup. On a miss, setdefault publishes the new
+        session atomically, so concurrent first calls for one session_id all
+        get the same WorkflowMemory without taking a lock.
+        """
+        session = self.sessions.get(session_id)
         if session is None:
-            session = self.create_session(session_id)
+            if len(self.sessions) >= self.max_sessions:
+                self._evict_oldest_session()
+            session = self.sessions.setdefault(session_id, WorkflowMemory(session_id))
         return session
     
     def delete_session(self, session_id: str) -> bool:
@@ -186,7 +283,10 @@ class MemoryManager:
             del self.sessions[session_id]
             
             # Also delete persisted file if it exists
-            session_file = self.storage_dir / f"{session_id}.json"
+            session_file = self._session_file(session_id)
+            with self._write_lock:
+                self._pending_writes.pop(session_file, None)
+                self._persisted_files.pop(session_id, None)
             if session_file.exists():
                 session_file.unlink()
             
@@ -200,41 +300,54 @@ class MemoryManager:
             return False
         
         try:
-            session_data = {
-                "session_id": session.session_id,
-                "created_at": session.created_at,
-                "last_accessed": session.last_accessed,
-                "entries": {
-                    key: {
-                        "key": entry.key,
-                        "value": entry.value,
-                        "timestamp": entry.timestamp,
-                        "task_id": entry.task_id,
-                        "agent": entry.agent,
-                        "access_count": entry.access_count,
-                        "last_accessed": entry.last_accessed
-                    }
-                    for key, entry in session.entries.items()
-                }
-            }
-            
-            session_file = self.storage_dir / f"{session_id}.json"
-            with open(session_file, 'w') as f:
-                json.dump(session_data, f, indent=2, default=str)
-            
+            session_file = self._session_file(session_id)
+            data = self._serialize_session(session)
+            # Supersede any older bytes still queued for this file, so the
+            # background writer can't later overwrite this newer state
+            with self._write_lock:
+                self._pending_writes.pop(session_file, None)
+                session_file.write_bytes(data)
+                self._persisted_files[session_id] = time.time()
+            session._dirty = False
             return True
         except Exception:
             return False
     
+    def _session_file(self, session_id: str) -> Path:
+        """Path of a session's persisted file."""
+        return self.storage_dir / f"{session_id}{self._suffix}"
+    
+    def _serialize_session(self, session: WorkflowMemory) -> bytes:
+        """Encode a session for persistence."""
+        # The live entries mapping is encoded in place: no per-entry dicts
+        # or copy of the mapping are built first
+        session_data = {
+            "session_id": session.session_id,
+            "created_at": session.created_at,
+            "last_accessed": session.last_accessed,
+            "entries": session.entries
+        }
+        if self.session_format == "pickle":
+            return pickle.dumps(session_data, protocol=5)
+        # orjson serializes the MemoryEntry dataclasses natively; str() is
+        # only called for values it can't encode
+        return orjson.dumps(session_data, default=str, option=orjson.OPT_NON_STR_KEYS)
+    
     def load_session(self, session_id: str) -> Optional[WorkflowMemory]:
         """Load a session from disk."""
-        session_file = self.storage_dir / f"{session_id}.json"
-        if not session_file.exists():
-            return None
+        session_file = self._session_file(session_id)
+        with self._write_lock:
+            data = self._pending_writes.get(session_file)
+        if data is None:
+            if not session_file.exists():
+                return None
+            data = session_file.read_bytes()
         
         try:
-            with open(session_file, 'r') as f:
-                session_data = json.load(f)
+            if self.session_format == "pickle":
+                session_data = pickle.loads(data)
+            else:
+                session_data = orjson.loads(data)
             
             # Recreate memory session
             memory = WorkflowMemory(session_id)
@@ -243,6 +356,10 @@ class MemoryManager:
             
             # Recreate entries
             for key, entry_data in session_data["entries"].items():
+                # Pickled sessions hold the MemoryEntry objects themselves
+                if isinstance(entry_data, MemoryEntry):
+                    memory._add_entry(entry_data)
+                    continue
                 entry = MemoryEntry(
                     key=entry_data["key"],
                     value=entry_data["value"],
@@ -252,7 +369,7 @@ class MemoryManager:
                     access_count=entry_data.get("access_count", 0),
                     last_accessed=entry_data.get("last_accessed", entry_data["timestamp"])
                 )
-                memory.entries[key] = entry
+                memory._add_entry(entry)
             
             self.sessions[session_id] = memory
             return memory
@@ -276,16 +393,41 @@ class MemoryManager:
             cleaned_count += 1
         
         # Clean up persisted sessions
-        for session_file in self.storage_dir.glob("*.json"):
+        with self._write_lock:
+            expired = [
+                session_id for session_id, mtime in self._persisted_files.items()
+                if mtime < cutoff_time
+            ]
+            for session_id in expired:
+                del self._persisted_files[session_id]
+        
+        for session_id in expired:
             try:
-                if session_file.stat().st_mtime < cutoff_time:
-                    session_file.unlink()
-                    cleaned_count += 1
+                os.unlink(self._session_file(session_id))
+                cleaned_count += 1
             except OSError:
                 continue
         
+        # Checkpoint what's left while we're at it
+        self.persist_dirty_sessions()
         return cleaned_count
     
+    def _scan_persisted_files(self) -> Dict[str, float]:
+        """Map session IDs to the mtimes of session files already on disk."""
+        persisted = {}
+        try:
+            with os.scandir(self.storage_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(self._suffix):
+                        continue
+                    try:
+                        persisted[entry.name[:-len(self._suffix)]] = entry.stat().st_mtime
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return persisted
+    
     def get_all_sessions(self) -> List[str]:
         """Get list of all active session IDs."""
         return list(self.sessions.keys())
@@ -298,20 +440,112 @@ class MemoryManager:
         oldest_session_id = min(self.sessions.keys(),
                                key=lambda sid: self.sessions[sid].last_accessed)
         
-        # Persist before evicting
-        self.persist_session(oldest_session_id)
+        # Persist before evicting, batched with every other dirty session; the
+        # writes happen off the caller's thread
+        self.persist_dirty_sessions(wait=False)
         del self.sessions[oldest_session_id]
+    
+    def persist_dirty_sessions(self, wait: bool = True) -> int:
+        """Persist every session changed since it was last saved, as one batch.
+        
+        The writes go through the background writer together and are followed
+        by a single fsync of the storage directory. Access statistics alone
+        don't mark a session dirty.
+        
+        Args:
+            wait: Block until the batch has reached disk
+            
+        Returns:
+            Number of sessions queued for writing
+        """
+        written = 0
+        for session_id, session in list(self.sessions.items()):
+            if session._dirty or session_id not in self._persisted_files:
+                written += self._queue_write(session_id, session)
+        
+        if written and wait:
+            self.flush()
+        return written
+    
+    def _queue_write(self, session_id: str, session: WorkflowMemory) -> bool:
+        """Serialize a session and hand it to the background writer."""
+        try:
+            data = self._serialize_session(session)
+        except Exception:
+            return False
+        session._dirty = False
+        
+        session_file = self._session_file(session_id)
+        with self._write_lock:
+            self._pending_writes[session_file] = data
+        self._ensure_writer()
+        self._write_queue.put(session_file)
+        return True
+    
+    def flush(self) -> None:
+        """Block until all queued session writes have reached disk."""
+        self._write_queue.join()
+    
+    def _ensure_writer(self) -> None:
+        """Start the background writer on first use."""
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._drain_writes, name="indra-memory-writer", daemon=True)
+            self._writer.start()
+            # Daemon threads are killed at exit; don't drop queued sessions
+            atexit.register(self.flush)
+    
+    def _drain_writes(self) -> None:
+        """Write queued sessions, taking everything queued in one batch."""
+        while True:
+            batch = [self._write_queue.get()]
+            while True:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            written = False
+            try:
+                for session_file in batch:
+                    # Held across the write so a concurrent delete or reload sees
+                    # either the pending bytes or the finished file
+                    with self._write_lock:
+                        data = self._pending_writes.pop(session_file, None)
+                        if data is not None:
+                            try:
+                                session_file.write_bytes(data)
+                                self._persisted_files[session_file.stem] = time.time()
+                                written = True
+                            except Exception:
+                                logger.exception("Failed to persist session %s", session_file.stem)
+                
+                # One directory fsync covers every file created in the batch
+                if written:
+                    self._sync_storage_dir()
+            finally:
+                # Always settle the batch, or flush() (also run at exit) would hang
+                for _ in batch:
+                    self._write_queue.task_done()
+    
+    def _sync_storage_dir(self) -> None:
+        """fsync the storage directory so newly created session files survive a crash."""
+        try:
+            dir_fd = os.open(self.storage_dir, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError:
+            # Directories can't be opened/fsynced on every platform
+            pass
 
 
-# Global memory manager instance
-_memory_manager = None
-
+# Global memory manager instance; still created on first use, since
+# MemoryManager creates its storage directory
+@functools.cache
 def get_memory_manager() -> MemoryManager:
     """Get the global memory manager instance."""
-    global _memory_manager
-    if _memory_manager is None:
-        _memory_manager = MemoryManager()
-    return _memory_manager
+    return MemoryManager()
 
 
 def get_workflow_memory(session_id: str) -> WorkflowMemory:
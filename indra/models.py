@@ -1,9 +1,10 @@
 """Simple data models for Indra."""
 
-import json
+import uuid
 from enum import Enum
-from typing import Dict, Any, List
-from pydantic import BaseModel
+from typing import Dict, Any, List, Union
+import orjson
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 
 
 class TaskStatus(str, Enum):
@@ -13,11 +14,16 @@ class TaskStatus(str, Enum):
     ERROR = "ERROR"
 
 
+def _new_task_id() -> str:
+    return f"task-{uuid.uuid4().hex[:8]}"
+
+
 class Task(BaseModel):
-    id: str
+    id: str = Field(default_factory=_new_task_id)
     task: str
     worker: str
     inputs: Dict[str, Any] = {}
+    after: List[str] = []  # IDs of tasks that must finish first
     status: TaskStatus = TaskStatus.PENDING
 
 
@@ -27,7 +33,27 @@ class WorkerResult(BaseModel):
     outputs: Dict[str, Any]
 
 
-def validate_task_json(json_str: str) -> List[Task]:
-    """Parse JSON string into Task objects."""
-    data = json.loads(json_str)
-    return [Task(**task_data) for task_data in data]
\ No newline at end of file
+_TASK_LIST = TypeAdapter(List[Task])
+
+
+def validate_task_json(json_str: Union[str, bytes]) -> List[Task]:
+    """Parse JSON string into Task objects (parsed and validated in one pass).
+    
+    Raises:
+        json.JSONDecodeError: If the JSON is malformed (orjson's subclass)
+        pydantic.ValidationError: If a task is invalid
+    """
+    try:
+        return _TASK_LIST.validate_json(json_str)
+    except ValidationError as e:
+        if e.errors()[0]['type'] == 'json_invalid':
+            # Re-parse on this error path only, to raise the JSONDecodeError
+            # (with its position) that callers catch for malformed JSON;
+            # orjson's is a json.JSONDecodeError subclass
+            orjson.loads(json_str)
+        raise
+
+
+def dump_tasks(tasks: List[Task]) -> List[Dict[str, Any]]:
+    """Convert tasks to payload dicts in one serializer call (same shape as Task.dict())."""
+    return _TASK_LIST.dump_python(tasks)
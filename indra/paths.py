@@ -0,0 +1,73 @@
+"""Runtime paths for ephemeral task and result files."""
+
+import os
+import stat
+import sys
+import tempfile
+from typing import Optional
+
+
+def get_runtime_dir() -> str:
+    """
+    Resolve the directory that holds queue and worker result files.
+    
+    Queue and result files are small and short-lived, so on Linux they default
+    to tmpfs (/dev/shm) to keep every rewrite in RAM. Set INDRA_RUNTIME_DIR to
+    override, e.g. to a dedicated mount:
+    
+        mount -t tmpfs -o size=64m,mode=0700 tmpfs /run/indra
+    
+    The default lives in a world-writable directory under a predictable name,
+    so it is created with mode 0700 and only used if it is a real directory
+    (not a symlink) owned by the current user. Otherwise a private directory
+    under ~/.cache, or failing that a fresh mkdtemp, is used instead.
+    
+    Returns:
+        Absolute path of the per-user runtime directory
+    """
+    override = os.getenv("INDRA_RUNTIME_DIR")
+    if override:
+        return override
+    
+    if not hasattr(os, "getuid"):
+        # No shared tmpfs; the temp dir is already per-user on Windows
+        return os.path.join(tempfile.gettempdir(), f"indra-{os.getenv('USERNAME', 'user')}")
+    
+    if sys.platform.startswith("linux") and os.path.isdir("/dev/shm"):
+        base = "/dev/shm"
+    else:
+        base = tempfile.gettempdir()
+    
+    for candidate in (os.path.join(base, f"indra-{os.getuid()}"),
+                      os.path.join(os.path.expanduser("~"), ".cache", "indra")):
+        runtime_dir = _private_dir(candidate)
+        if runtime_dir is not None:
+            return runtime_dir
+    return tempfile.mkdtemp(prefix="indra-")
+
+
+def _private_dir(path: str) -> Optional[str]:
+    """Create path as a 0700 directory, returning it only if it is ours alone.
+    
+    Returns None when path is a symlink, not a directory, owned by another
+    user, or can't be created.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.mkdir(path, 0o700)
+        except FileExistsError:
+            pass
+        st = os.lstat(path)
+        if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+            return None
+        if st.st_mode & 0o077:
+            os.chmod(path, 0o700)  # ours, but created with a looser mode
+    except OSError:
+        return None
+    return path
+
+
+RUNTIME_DIR = get_runtime_dir()
+DEFAULT_QUEUE_DIR = os.path.join(RUNTIME_DIR, "queue")
+DEFAULT_RESULTS_DIR = os.path.join(RUNTIME_DIR, "results")
@@ -0,0 +1,112 @@
+"""Similarity cache of generated BeeScript plans, keyed by prompt embedding."""
+
+import math
+import operator
+import os
+import sqlite3
+import threading
+import orjson
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .cache import DEFAULT_CACHE_DIR
+
+
+def _normalize(vector: Sequence[float]) -> array:
+    """Scale an embedding to unit length so a dot product is cosine similarity."""
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return array('f', (x / norm for x in vector))
+
+
+class PlanCache:
+    """
+    Store of validated BeeScripts, looked up by prompt similarity.
+    
+    Plans live in a SQLite database next to the worker result cache. The
+    unit-normalized float32 embeddings are mirrored in memory and topped up
+    from the database on each lookup (so plans cached by other processes are
+    seen), making a lookup one dot product per stored plan.
+    
+    A lookup only matches plans generated for the same budget and timeout.
+    Matches at or above exact_threshold are reused as-is; matches at or
+    above threshold are starting points the Queen adapts to the new prompt.
+    """
+    
+    def __init__(self, cache_dir: Optional[str] = None, threshold: float = 0.92,
+                 exact_threshold: float = 0.99):
+        self.cache_dir = cache_dir or os.getenv("INDRA_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.db_path = os.path.join(self.cache_dir, "plans.sqlite3")
+        self.threshold = threshold
+        self.exact_threshold = exact_threshold
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # (row id, budget, timeout, unit embedding), in row id order
+        self._vectors: List[Tuple[int, int, int, array]] = []
+        self._last_id = 0
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans (id INTEGER PRIMARY KEY, budget INTEGER NOT NULL, "
+                "timeout INTEGER NOT NULL, embedding BLOB NOT NULL, script BLOB NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+    
+    def _refresh(self, conn: sqlite3.Connection) -> None:
+        """Load embeddings added since the last lookup. Caller holds _lock."""
+        rows = conn.execute(
+            "SELECT id, budget, timeout, embedding FROM plans WHERE id > ? ORDER BY id",
+            (self._last_id,)
+        ).fetchall()
+        for row_id, budget, timeout, blob in rows:
+            vector = array('f')
+            vector.frombytes(blob)
+            self._vectors.append((row_id, budget, timeout, vector))
+            self._last_id = row_id
+    
+    def lookup(self, embedding: Sequence[float], budget_credits: int,
+               timeout_minutes: int) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """
+        Find the most similar cached plan for the same budget and timeout.
+        
+        Returns:
+            (similarity, BeeScript dict) if the best match reaches threshold,
+            otherwise None
+        """
+        query = _normalize(embedding)
+        try:
+            conn = self._connect()
+            best_id, best = None, self.threshold
+            with self._lock:
+                self._refresh(conn)
+                for row_id, budget, timeout, vector in self._vectors:
+                    if budget != budget_credits or timeout != timeout_minutes or len(vector) != len(query):
+                        continue
+                    similarity = sum(map(operator.mul, query, vector))
+                    if similarity >= best:
+                        best_id, best = row_id, similarity
+            
+            if best_id is None:
+                return None
+            row = conn.execute("SELECT script FROM plans WHERE id = ?", (best_id,)).fetchone()
+            return (best, orjson.loads(row[0])) if row else None
+        except (OSError, sqlite3.Error, orjson.JSONDecodeError):
+            return None
+    
+    def put(self, embedding: Sequence[float], budget_credits: int, timeout_minutes: int,
+            script: Dict[str, Any]) -> None:
+        """Store a validated plan. Cache write failures are not fatal."""
+        try:
+            data = orjson.dumps(script, option=orjson.OPT_NON_STR_KEYS)
+            self._connect().execute(
+                "INSERT INTO plans (budget, timeout, embedding, script) VALUES (?, ?, ?, ?)",
+                (budget_credits, timeout_minutes, _normalize(embedding).tobytes(), data)
+            )
+        except (OSError, sqlite3.Error, orjson.JSONEncodeError):
+            pass
@@ -0,0 +1,157 @@
+"""Worker pool - run independent tasks in parallel.
+
+I/O-bound workers (the default: anything waiting on an LLM API) run in a
+thread pool. Workers that declare ``executor = "process"`` run in a process
+pool so CPU-heavy Python code is not serialized by the GIL. A worker class
+may also set ``max_concurrency`` to cap how many of its tasks are in flight
+at once, independently of the overall pool size.
+
+Process workers are started with the platform's default start method. Under
+"spawn" (macOS, Windows) the calling script must guard its entry point with
+``if __name__ == "__main__":`` and define custom workers in an importable
+module, otherwise the child processes cannot find them in the registry.
+
+Both entry points accept an ``on_done`` callback, invoked in the calling
+thread as each task finishes with its index and outcome. It returns further
+items to run, which are submitted straight away, so a dependency graph can
+be executed with each successor starting as soon as its own prerequisites
+finish instead of waiting for a whole wave.
+"""
+
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type, Union
+
+from .base_worker import BaseWorker, get_worker, get_worker_class
+from .paths import DEFAULT_RESULTS_DIR
+
+# (worker name, BaseWorker method, argument)
+_Call = Tuple[str, str, Any]
+Outcome = Union[Dict[str, Any], None, Exception]
+# (index of the finished item, its outcome) -> further items to run
+OnDone = Callable[[int, Outcome], Iterable[Any]]
+
+
+def run_tasks(tasks: List[Dict[str, Any]], workers: Optional[int] = None,
+              results_dir: str = DEFAULT_RESULTS_DIR, on_done: Optional[OnDone] = None) -> List[Outcome]:
+    """
+    Execute task payloads in memory, in parallel.
+    
+    Args:
+        tasks: Task payloads, each with at least 'id' and 'worker'
+        workers: Maximum pool size (defaults to the executor's own default)
+        results_dir: Results directory handed to each worker instance
+        on_done: Optional callback returning more task payloads to run
+    
+    Returns:
+        One entry per task, in submission order (including tasks added by
+        on_done): the result payload, or the exception the task raised
+    """
+    return _run([_task_call(t) for t in tasks], workers, results_dir, on_done, _task_call)
+
+
+def run_task_files(task_files: List[Tuple[str, str]], workers: Optional[int] = None,
+                   results_dir: str = DEFAULT_RESULTS_DIR, on_done: Optional[OnDone] = None) -> List[Outcome]:
+    """
+    Execute task files in parallel via BaseWorker.process_task_file.
+    
+    Args:
+        task_files: (worker name, task file path) pairs
+        workers: Maximum pool size (defaults to the executor's own default)
+        results_dir: Directory where workers write result files
+        on_done: Optional callback returning more (worker name, path) pairs
+    
+    Returns:
+        One entry per file, in submission order (including files added by
+        on_done): None on success, or the exception the task raised
+    """
+    return _run([_file_call(item) for item in task_files], workers, results_dir, on_done, _file_call)
+
+
+def _task_call(task_data: Dict[str, Any]) -> _Call:
+    return (task_data['worker'], 'process_task', task_data)
+
+
+def _file_call(task_file: Tuple[str, str]) -> _Call:
+    return (task_file[0], 'process_task_file', task_file[1])
+
+
+def _call_worker(worker_name: str, method: str, arg: Any, results_dir: str) -> Any:
+    """Run one task on a registered worker (module-level so it pickles for process pools).
+    
+    Process workers look the name up in the child's own registry.
+    """
+    return _call_worker_class(get_worker_class(worker_name), worker_name, method, arg, results_dir)
+
+
+def _call_worker_class(worker_class: Type[BaseWorker], worker_name: str, method: str,
+                       arg: Any, results_dir: str) -> Any:
+    """Run one task on an already resolved worker class (thread pools)."""
+    return getattr(get_worker(worker_class, worker_name, results_dir), method)(arg)
+
+
+def _run(calls: List[_Call], workers: Optional[int], results_dir: str,
+         on_done: Optional[OnDone] = None, to_call: Optional[Callable[[Any], _Call]] = None) -> List[Outcome]:
+    """Submit calls to the right pool, honouring per-worker concurrency caps."""
+    outcomes: List[Outcome] = [None] * len(calls)
+    if not calls:
+        return outcomes
+    
+    backlog = deque(enumerate(calls))
+    in_flight: Dict[Future, Tuple[int, str]] = {}
+    running: Dict[str, int] = defaultdict(int)
+    pools: Dict[str, Any] = {}
+    
+    def finish(index: int, outcome: Outcome) -> None:
+        outcomes[index] = outcome
+        if on_done is not None:
+            for item in on_done(index, outcome):
+                outcomes.append(None)
+                backlog.append((len(outcomes) - 1, to_call(item)))
+    
+    try:
+        while backlog or in_flight:
+            deferred = deque()
+            while backlog:
+                index, (worker_name, method, arg) = backlog.popleft()
+                try:
+                    worker_class = get_worker_class(worker_name)
+                except KeyError as e:
+                    finish(index, e)
+                    continue
+                
+                cap = worker_class.max_concurrency
+                if cap and running[worker_name] >= cap:
+                    deferred.append((index, (worker_name, method, arg)))
+                    continue
+                
+                kind = worker_class.executor
+                if kind not in pools:
+                    pool_class = ProcessPoolExecutor if kind == "process" else ThreadPoolExecutor
+                    pools[kind] = pool_class(max_workers=workers)
+                
+                if kind == "process":
+                    future = pools[kind].submit(_call_worker, worker_name, method, arg, results_dir)
+                else:
+                    future = pools[kind].submit(_call_worker_class, worker_class, worker_name, method, arg, results_dir)
+                in_flight[future] = (index, worker_name)
+                running[worker_name] += 1
+            backlog = deferred
+            
+            if not in_flight:
+                break
+            
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, worker_name = in_flight.pop(future)
+                running[worker_name] -= 1
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    outcome = e
+                finish(index, outcome)
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=True)
+    
+    return outcomes
@@ -1,35 +1,104 @@
 """Queen Agent - Enhanced task breakdown using OpenAI with BeeScript support."""
 
-import json
+import asyncio
+import functools
+import string
+import time
 import uuid
+import orjson
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from .models import Task, validate_task_json
-from .beescript import BeeScript, BeeScriptTask, parse_beescript, BeeScriptValidator
+from .beescript import (
+    BeeScript, BeeScriptTask, parse_beescript, BeeScriptValidator, total_cost_estimate, beescript_to_dict,
+    break_cycles
+)
 from .credits import estimate_task_cost
+from .plan_cache import PlanCache
+
+
+# JSON mode: the model must emit a single raw JSON object, so responses
+# parse directly without stripping markdown fences
+_JSON_OBJECT = {"type": "json_object"}
+
+_PROMPTS_DIR = Path(__file__).parent / "prompts"
+
+
+@functools.lru_cache(maxsize=None)
+def _read_prompt(name: str) -> str:
+    """Read a prompt template once per process."""
+    return (_PROMPTS_DIR / name).read_text()
+
+
+_CONVERSIONS = {"r": repr, "s": str, "a": ascii}
+
+
+@functools.lru_cache(maxsize=None)
+def _split_template(template: str) -> Optional[Tuple[Tuple[str, Optional[str], str, Optional[str]], ...]]:
+    """Pre-split a str.format template into (literal, field name, spec, conversion) pieces.
+    
+    Returns None for templates using what the fast path doesn't handle:
+    positional or attribute/index fields ({0}, {a.b}, {a[0]}) and nested
+    fields inside a format spec.
+    """
+    pieces = tuple(string.Formatter().parse(template))
+    for _, field, spec, _ in pieces:
+        if field is not None and (not field.isidentifier() or "{" in spec):
+            return None
+    return pieces
+
+
+def _render(template: str, **values: Any) -> str:
+    """Same result as template.format(**values), without re-parsing the template."""
+    pieces = _split_template(template)
+    if pieces is None:
+        return template.format(**values)
+    parts = []
+    for literal, field, spec, conversion in pieces:
+        parts.append(literal)
+        if field is not None:
+            value = values[field]
+            if conversion:
+                value = _CONVERSIONS[conversion](value)
+            parts.append(format(value, spec))
+    return "".join(parts)
 
 
 class Queen:
-    """Enhanced Queen agent with BeeScript planning capabilities."""
+    """Enhanced Queen agent with BeeScript planning capabilities.
+    
+    Planning uses `model`, a small fast model that handles schema-constrained
+    JSON well; BeeScript attempts after an unparseable or invalid plan go to
+    the stronger `fallback_model`.
     
-    def __init__(self, openai_client: OpenAI):
+    Pass a PlanCache to reuse plans for prompts similar to ones planned
+    before: near-identical prompts get the cached plan back, similar ones
+    have it adapted by a cheaper model instead of planning from scratch.
+    """
+    
+    EMBEDDING_MODEL = "text-embedding-3-small"
+    ADAPT_MODEL = "gpt-4o-mini"
+    
+    def __init__(self, openai_client: OpenAI, plan_cache: Optional[PlanCache] = None,
+                 model: str = "gpt-4o-mini", fallback_model: str = "gpt-4o",
+                 async_client: Optional[AsyncOpenAI] = None):
         self.client = openai_client
+        self.async_client = async_client
+        self.plan_cache = plan_cache
+        self.model = model
+        self.fallback_model = fallback_model
         self.validator = BeeScriptValidator()
         self.logger = logging.getLogger(__name__)
         
-        # Load prompt templates
-        prompt_path = Path(__file__).parent / "prompts" / "queen.txt"
-        with open(prompt_path, 'r') as f:
-            self.prompt_template = f.read()
+        # Load prompt templates (read from disk once per process)
+        self.prompt_template = _read_prompt("queen.txt")
         
         # Load BeeScript template
-        beescript_prompt_path = Path(__file__).parent / "prompts" / "beescript_queen.txt"
-        if beescript_prompt_path.exists():
-            with open(beescript_prompt_path, 'r') as f:
-                self.beescript_template = f.read()
-        else:
+        try:
+            self.beescript_template = _read_prompt("beescript_queen.txt")
+        except FileNotFoundError:
             # Fallback template
             self.beescript_template = self._get_default_beescript_template()
     
@@ -37,77 +106,148 @@ class Queen:
         """Generate simple tasks from user prompt (legacy method)."""
         # Call OpenAI API
         response = self.client.chat.completions.create(
-            model="gpt-4",
+            model=self.model,
             messages=[
                 {"role": "system", "content": "Generate valid JSON task lists."},
-                {"role": "user", "content": self.prompt_template.format(user_prompt=user_prompt)}
+                {"role": "user", "content": _render(self.prompt_template, user_prompt=user_prompt)}
             ],
             temperature=0.1,
             max_tokens=2000
         )
         
         # Parse response
-        response_content = response.choices[0].message.content.strip()
-        task_data = json.loads(response_content)
-        
-        # Create Task objects
-        tasks = []
-        for task_dict in task_data:
-            if 'id' not in task_dict:
-                task_dict['id'] = f"task-{uuid.uuid4().hex[:8]}"
-            tasks.append(Task(**task_dict))
-        
-        return tasks
+        # Tasks without an ID get a generated one. The JSON parser skips
+        # surrounding whitespace itself, so the content is not copied first.
+        return validate_task_json(response.choices[0].message.content)
     
     def generate_beescript(self, user_prompt: str, budget_credits: int = 100, 
                           timeout_minutes: int = 10, max_retries: int = 3) -> BeeScript:
         """Generate a complete BeeScript workflow from user prompt."""
+        embedding = None
+        if self.plan_cache is not None:
+            try:
+                embedding = self.client.embeddings.create(
+                    model=self.EMBEDDING_MODEL, input=user_prompt
+                ).data[0].embedding
+                script = self._plan_from_cache(user_prompt, embedding, budget_credits, timeout_minutes)
+                if script is not None:
+                    return script
+            except Exception as e:
+                self.logger.warning(f"Plan cache unavailable, planning from scratch: {e}")
+        
+        script = self._plan_beescript(user_prompt, budget_credits, timeout_minutes, max_retries)
+        if embedding is not None:
+            self.plan_cache.put(embedding, budget_credits, timeout_minutes, beescript_to_dict(script))
+        return script
+    
+    async def generate_beescript_async(self, user_prompt: str, budget_credits: int = 100,
+                                       timeout_minutes: int = 10, max_retries: int = 3,
+                                       hedge_delay: float = 1.0) -> BeeScript:
+        """Generate a BeeScript with hedged, overlapping attempts.
+        
+        Rather than waiting for an attempt to fail before retrying, attempt i
+        is launched hedge_delay * 2**(i-1) seconds after the first, so a slow
+        or bad response overlaps with the next try. The first attempt to
+        return a valid BeeScript wins and the rest are cancelled; attempts not
+        yet started never hit the API. hedge_delay=0 launches all at once.
+        
+        Raises:
+            ValueError: If no attempt produced a valid BeeScript
+        """
+        client = self._get_async_client()
+        request = self._beescript_request(user_prompt, budget_credits, timeout_minutes)
+        
+        async def attempt(index: int) -> BeeScript:
+            if index:
+                await asyncio.sleep(hedge_delay * 2 ** (index - 1))
+            response = await client.chat.completions.create(**request)
+            script = parse_beescript(response.choices[0].message.content)
+            self._fill_cost_estimates(script)
+            if not self.validator.validate(script):
+                raise ValueError(f"Invalid BeeScript: {self.validator.errors}")
+            return script
+        
+        attempts = [asyncio.ensure_future(attempt(i)) for i in range(max_retries)]
+        last_error: Optional[Exception] = None
+        try:
+            for finished in asyncio.as_completed(attempts):
+                try:
+                    return await finished
+                except Exception as e:
+                    last_error = e
+                    self.logger.warning(f"BeeScript attempt failed: {e}")
+        finally:
+            for pending in attempts:
+                pending.cancel()
+        
+        raise ValueError(f"Failed to generate valid BeeScript: {last_error}")
+    
+    def _get_async_client(self) -> AsyncOpenAI:
+        """Get the async client, deriving one from the sync client's settings if needed."""
+        if self.async_client is None:
+            self.async_client = AsyncOpenAI(api_key=self.client.api_key, base_url=self.client.base_url)
+        return self.async_client
+    
+    def _plan_from_cache(self, user_prompt: str, embedding: List[float], budget_credits: int,
+                         timeout_minutes: int) -> Optional[BeeScript]:
+        """Reuse or adapt a cached plan for a similar prompt; None on a miss."""
+        hit = self.plan_cache.lookup(embedding, budget_credits, timeout_minutes)
+        if hit is None:
+            return None
+        similarity, cached = hit
+        self.logger.info(f"Plan cache hit similarity={similarity:.3f}")
+        
+        if similarity >= self.plan_cache.exact_threshold:
+            script = parse_beescript(cached)
+        else:
+            response = self.client.chat.completions.create(
+                model=self.ADAPT_MODEL,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are an expert workflow planner. Generate valid BeeScript JSON."
+                    },
+                    {
+                        "role": "user",
+                        "content": (
+                            "Adapt this BeeScript, written for a similar request, to the new request. "
+                            "Keep its structure where it still applies.\n\n"
+                            f"NEW REQUEST: {user_prompt}\n"
+                            f"Budget: {budget_credits} credits maximum\n"
+                            f"Timeout: {timeout_minutes} minutes maximum\n\n"
+                            f"EXISTING BEESCRIPT:\n{orjson.dumps(cached).decode()}\n\n"
+                            "Return only the adapted BeeScript JSON."
+                        )
+                    }
+                ],
+                temperature=0.1,
+                max_tokens=3000,
+                response_format=_JSON_OBJECT
+            )
+            script = parse_beescript(response.choices[0].message.content)
+            self._fill_cost_estimates(script)
+        
+        if self.validator.validate(script):
+            return script
+        self.logger.warning(f"Cached plan rejected: {self.validator.errors}")
+        return None
+    
+    def _plan_beescript(self, user_prompt: str, budget_credits: int, timeout_minutes: int,
+                        max_retries: int) -> BeeScript:
+        """Plan a BeeScript with the full model, retrying and repairing as needed."""
         self.logger.info(f"Generating BeeScript for: {user_prompt[:100]}...")
         
         for attempt in range(max_retries):
             try:
-                # Call OpenAI API with BeeScript template
+                # Call OpenAI API with BeeScript template; escalate after a failed attempt
+                model = self.model if attempt == 0 else self.fallback_model
                 response = self.client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[
-                        {
-                            "role": "system", 
-                            "content": "You are an expert workflow planner. Generate valid BeeScript JSON."
-                        },
-                        {
-                            "role": "user", 
-                            "content": self.beescript_template.format(
-                                user_prompt=user_prompt,
-                                budget_credits=budget_credits,
-                                timeout_minutes=timeout_minutes
-                            )
-                        }
-                    ],
-                    temperature=0.1,
-                    max_tokens=3000
+                    **self._beescript_request(user_prompt, budget_credits, timeout_minutes, model)
                 )
                 
-                # Parse response
-                response_content = response.choices[0].message.content.strip()
-                
-                # Extract JSON from response (handle markdown code blocks)
-                if "```json" in response_content:
-                    json_start = response_content.find("```json") + 7
-                    json_end = response_content.find("```", json_start)
-                    response_content = response_content[json_start:json_end].strip()
-                elif "```" in response_content:
-                    json_start = response_content.find("```") + 3
-                    json_end = response_content.find("```", json_start)
-                    response_content = response_content[json_start:json_end].strip()
-                
-                # Parse BeeScript
-                script_data = json.loads(response_content)
-                script = parse_beescript(script_data)
-                
-                # Add cost estimates to tasks
-                for task in script.subtasks:
-                    if task.cost_estimate == 10:  # Default value, needs estimation
-                        task.cost_estimate = estimate_task_cost(task.agent, task.task, task.params)
+                # JSON mode: the response is the raw BeeScript object, no code fences
+                script = parse_beescript(response.choices[0].message.content)
+                self._fill_cost_estimates(script)
                 
                 # Validate the script
                 if self.validator.validate(script):
@@ -124,7 +264,7 @@ class Queen:
                         else:
                             raise ValueError(f"Failed to generate valid BeeScript: {self.validator.errors}")
             
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 self.logger.warning(f"JSON decode error (attempt {attempt + 1}): {e}")
                 if attempt == max_retries - 1:
                     raise ValueError(f"Failed to parse BeeScript JSON: {e}")
@@ -136,6 +276,198 @@ class Queen:
         
         raise ValueError("Failed to generate valid BeeScript after all retries")
     
+    def generate_beescripts_batch(self, user_prompts: List[str], budget_credits: int = 100,
+                                  timeout_minutes: int = 10, max_retries: int = 3) -> List[BeeScript]:
+        """Generate BeeScripts for several prompts with a single API call.
+        
+        The model returns {"beescripts": [...]} with one BeeScript per prompt. Any script
+        that is missing or invalid (or the whole batch, if the response can't be
+        parsed) is regenerated on its own with generate_beescript.
+        """
+        if not user_prompts:
+            return []
+        
+        self.logger.info(f"Generating {len(user_prompts)} BeeScripts in one request")
+        
+        enumerated = "\n\n".join(
+            f"### Prompt {i + 1}\n{prompt}" for i, prompt in enumerate(user_prompts)
+        )
+        candidates: List[Any] = []
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "You are an expert workflow planner. Return a JSON object whose "
+                            "\"beescripts\" array holds the valid BeeScript JSON for prompt i at index i."
+                        )
+                    },
+                    {
+                        "role": "user",
+                        "content": _render(
+                            self.beescript_template,
+                            user_prompt=enumerated,
+                            budget_credits=budget_credits,
+                            timeout_minutes=timeout_minutes
+                        ) + (
+                            f"\n\nReturn {{\"beescripts\": [...]}} with {len(user_prompts)} BeeScripts, "
+                            "one per prompt, in order."
+                        )
+                    }
+                ],
+                temperature=0.1,
+                max_tokens=3000 * len(user_prompts),
+                response_format=_JSON_OBJECT
+            )
+            parsed = orjson.loads(response.choices[0].message.content)
+            if isinstance(parsed, dict):
+                parsed = parsed.get("beescripts")
+            if isinstance(parsed, list):
+                candidates = parsed
+        except Exception as e:
+            self.logger.warning(f"Batch BeeScript generation failed, falling back per prompt: {e}")
+        
+        scripts = []
+        for i, prompt in enumerate(user_prompts):
+            script = None
+            if i < len(candidates):
+                try:
+                    script = parse_beescript(candidates[i])
+                    self._fill_cost_estimates(script)
+                    if not self.validator.validate(script):
+                        self.logger.warning(f"Invalid BeeScript for prompt {i + 1}: {self.validator.errors}")
+                        script = None
+                except Exception as e:
+                    self.logger.warning(f"Could not parse BeeScript for prompt {i + 1}: {e}")
+                    script = None
+            
+            if script is None:
+                script = self.generate_beescript(prompt, budget_credits, timeout_minutes, max_retries)
+            scripts.append(script)
+        
+        return scripts
+    
+    def submit_beescripts_batch(self, user_prompts: List[str], budget_credits: int = 100,
+                                timeout_minutes: int = 10) -> str:
+        """Submit BeeScript generation for many prompts to the OpenAI Batch API.
+        
+        Batch requests cost less and don't count against the rate limit, but
+        complete asynchronously (within 24 hours). Collect the results with
+        fetch_beescripts.
+        
+        Returns:
+            The batch ID
+        """
+        lines = [
+            orjson.dumps({
+                "custom_id": f"p{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._beescript_request(prompt, budget_credits, timeout_minutes)
+            })
+            for i, prompt in enumerate(user_prompts)
+        ]
+        batch_file = self.client.files.create(
+            file=("beescripts.jsonl", b"\n".join(lines) + b"\n"),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        self.logger.info(f"Submitted {len(user_prompts)} BeeScript requests as batch {batch.id}")
+        return batch.id
+    
+    def fetch_beescripts(self, batch_id: str, poll_interval: float = 30,
+                         timeout: Optional[float] = None) -> List[Optional[BeeScript]]:
+        """Wait for a batch from submit_beescripts_batch and parse its BeeScripts.
+        
+        Returns:
+            One entry per submitted prompt, in order; None where the request
+            failed or produced an invalid BeeScript
+        
+        Raises:
+            TimeoutError: If the batch hasn't finished within timeout seconds
+            ValueError: If the batch failed or was cancelled without output
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        batch = self.client.batches.retrieve(batch_id)
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            if deadline is not None and time.time() >= deadline:
+                raise TimeoutError(f"Batch {batch_id} still {batch.status} after {timeout}s")
+            time.sleep(poll_interval)
+            batch = self.client.batches.retrieve(batch_id)
+        
+        # Expired batches still return whatever requests finished in time
+        if not batch.output_file_id:
+            raise ValueError(f"Batch {batch_id} ended with status {batch.status} and no output")
+        
+        # request_counts may be missing; the custom_ids still say where each result goes
+        counts = getattr(batch, "request_counts", None)
+        scripts: List[Optional[BeeScript]] = [None] * ((counts.total if counts else None) or 0)
+        output = self.client.files.content(batch.output_file_id).content
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            index = int(record["custom_id"][1:])
+            if index >= len(scripts):
+                scripts.extend([None] * (index + 1 - len(scripts)))
+            response = record.get("response") or {}
+            if response.get("status_code") != 200:
+                self.logger.warning(f"Batch request {record['custom_id']} failed: {record.get('error')}")
+                continue
+            
+            try:
+                content = response["body"]["choices"][0]["message"]["content"]
+                script = parse_beescript(content)
+                self._fill_cost_estimates(script)
+            except Exception as e:
+                self.logger.warning(f"Could not parse BeeScript for {record['custom_id']}: {e}")
+                continue
+            
+            if self.validator.validate(script):
+                scripts[index] = script
+            else:
+                self.logger.warning(f"Invalid BeeScript for {record['custom_id']}: {self.validator.errors}")
+        
+        return scripts
+    
+    def _beescript_request(self, user_prompt: str, budget_credits: int,
+                           timeout_minutes: int, model: Optional[str] = None) -> Dict[str, Any]:
+        """Chat completion parameters for generating one BeeScript."""
+        return {
+            "model": model or self.model,
+            "messages": [
+                {
+                    "role": "system", 
+                    "content": "You are an expert workflow planner. Generate valid BeeScript JSON."
+                },
+                {
+                    "role": "user", 
+                    "content": _render(
+                        self.beescript_template,
+                        user_prompt=user_prompt,
+                        budget_credits=budget_credits,
+                        timeout_minutes=timeout_minutes
+                    )
+                }
+            ],
+            "temperature": 0.1,
+            "max_tokens": 3000,
+            "response_format": _JSON_OBJECT
+        }
+    
+    @staticmethod
+    def _fill_cost_estimates(script: BeeScript) -> None:
+        """Add cost estimates to tasks still carrying the default."""
+        for task in script.subtasks:
+            if task.cost_estimate == 10:  # Default value, needs estimation
+                task.cost_estimate = estimate_task_cost(task.agent, task.task, task.params)
+    
     def _attempt_script_repair(self, script: BeeScript) -> BeeScript:
         """Attempt to repair common issues in generated BeeScript."""
         # Fix missing task IDs
@@ -145,24 +477,25 @@ class Queen:
                 task.id = f"task-{uuid.uuid4().hex[:8]}"
             used_ids.add(task.id)
         
-        # Fix invalid dependencies
-        valid_ids = {task.id for task in script.subtasks}
-        for task in script.subtasks:
-            task.after = [dep for dep in task.after if dep in valid_ids]
-        
-        # Fix budget issues
-        total_estimated = sum(task.cost_estimate for task in script.subtasks)
-        if total_estimated > script.budget_credits:
-            # Scale down cost estimates proportionally
-            scale_factor = (script.budget_credits * 0.9) / total_estimated
-            for task in script.subtasks:
-                task.cost_estimate = max(1, int(task.cost_estimate * scale_factor))
+        # Budget check up front, so the fixes below share a single pass
+        total_estimated = total_cost_estimate(script.subtasks)
+        # Scale down cost estimates proportionally when over budget
+        scale_factor = (script.budget_credits * 0.9) / total_estimated if total_estimated > script.budget_credits else 1
         
-        # Fix negative or zero values
+        # Fix invalid dependencies (used_ids now holds exactly the final IDs),
+        # budget overruns and negative or zero values
         for task in script.subtasks:
-            task.cost_estimate = max(1, task.cost_estimate)
-            task.retry_max = max(0, task.retry_max)
-            task.timeout_seconds = max(10, task.timeout_seconds)
+            task.after = [dep for dep in task.after if dep in used_ids]
+            task.cost_estimate = max(1, int(task.cost_estimate * scale_factor))
+            if task.retry_max < 0:
+                task.retry_max = 0
+            if task.timeout_seconds < 10:
+                task.timeout_seconds = 10
+        
+        # Break dependency cycles, one dropped edge per cycle
+        dropped = break_cycles(script.subtasks)
+        if dropped:
+            self.logger.warning(f"Dropped cyclic dependencies (task, dependency): {dropped}")
         
         return script
     
@@ -1,95 +1,473 @@
 """Router - Task dispatch and monitoring."""
 
-import json
+import os
+import threading
 import time
-from typing import List, Dict
+from collections import Counter, deque
+from typing import Any, Iterator, List, Dict, Optional, Tuple
 from pathlib import Path
-from .models import Task, TaskStatus
-from .base_worker import get_worker_class
+from .models import Task, TaskStatus, dump_tasks
+from .pool import Outcome, run_tasks, run_task_files
+from . import wire
+from .dispatch import TodoQueue, CompletedQueue, TaskGraph
+from .task_store import TaskStore
+from .paths import DEFAULT_QUEUE_DIR, DEFAULT_RESULTS_DIR
+from .utils import atomic_write_bytes, ensure_dir, open_dir, read_file_bytes
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional: wait_for_completion falls back to polling
+    FileSystemEventHandler = object
+    Observer = None
+
+
+class _QueueChangeHandler(FileSystemEventHandler):
+    """Wakes a waiting Router whenever anything in the queue directory changes."""
+    
+    def __init__(self, changed: threading.Event):
+        super().__init__()
+        self.changed = changed
+    
+    def on_any_event(self, event) -> None:
+        self.changed.set()
 
 
 class Router:
-    """Dispatches tasks and monitors execution."""
+    """Dispatches tasks and monitors execution.
+    
+    In "file" mode (default) tasks are exchanged through task files in
+    queue_dir. In "memory" mode tasks flow through in-process To-do/Completed
+    queues and no files are written. In "sqlite" mode tasks run in process as
+    in memory mode, but their status, payload and result are also kept in a
+    WAL-mode SQLite table (queue_dir/tasks.sqlite3), so progress and pending
+    work survive the process and are visible to other routers as one query.
     
-    def __init__(self, queue_dir: str = "queue", results_dir: str = "results"):
+    Either way, dependencies declared in Task.after are resolved once at
+    dispatch: tasks with no unmet dependencies go straight to a ready queue
+    and each completion releases its successors, so the queue directory is
+    never rescanned to find runnable work.
+    
+    While waiting on task files updated by workers outside this process,
+    wait_for_completion sleeps until the queue directory changes when
+    watchdog is installed, and polls once a second otherwise; each wake-up
+    re-reads the task files of tasks still pending. Call close() (or use the
+    Router as a context manager) to stop the watcher thread.
+    """
+    
+    MODES = ("file", "memory", "sqlite")
+    
+    def __init__(self, queue_dir: str = DEFAULT_QUEUE_DIR, results_dir: str = DEFAULT_RESULTS_DIR,
+                 mode: str = "file", max_workers: Optional[int] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown router mode '{mode}'. Expected one of: {list(self.MODES)}")
+        
         self.queue_dir = Path(queue_dir)
         self.results_dir = Path(results_dir)
+        self.mode = mode
+        self.max_workers = max_workers
+        
+        # In-process queues used by memory mode
+        self.todo = TodoQueue()
+        self.completed = CompletedQueue()
+        self._task_states: Dict[str, str] = {}
+        self._state_counts: Counter = Counter()
+        
+        # Dependency scheduling: payloads of tasks known to this router and those ready to run
+        self._graph = TaskGraph()
+        self._scheduled: Dict[str, Dict[str, Any]] = {}
+        self._ready: deque = deque()
+        
+        self.store = TaskStore(self.queue_dir / "tasks.sqlite3") if mode == "sqlite" else None
+        
+        # Decoded task files keyed by path, with the (inode, mtime, size) they were read at
+        self._file_cache: Dict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+        
+        # Queue directory watcher, started on the first wait in file mode
+        self._changed = threading.Event()
+        self._observer = None
         
         # Ensure directories exist
-        self.queue_dir.mkdir(exist_ok=True)
-        self.results_dir.mkdir(exist_ok=True)
+        if mode == "file":
+            ensure_dir(self.queue_dir)
+            ensure_dir(self.results_dir)
     
     def dispatch_tasks(self, tasks: List[Task]) -> None:
-        """Create task files in queue directory."""
+        """Create task files in queue directory (or enqueue them in memory mode)."""
         if not tasks:
             return
-            
-        for task in tasks:
-            try:
-                task_file = self.queue_dir / f"{task.id}.json"
-                with open(task_file, 'w') as f:
-                    json.dump(task.dict(), f, indent=2)
-            except (OSError, IOError) as e:
-                print(f"Error dispatching task {task.id}: {e}")
-                continue
+        
+        # Serialized once: the same payloads feed task files, the store and the To-do queue
+        pairs = list(zip(tasks, dump_tasks(tasks)))
+        if self.store is not None:
+            self.store.add(payload for _, payload in pairs)
+        
+        if self.mode == "file":
+            pairs = self._write_task_files(pairs)
+        
+        for task, payload in pairs:
+            self._scheduled[task.id] = payload
+            self._set_state(task.id, TaskStatus.PENDING)
+            if self._graph.add(task.id, task.after):
+                self._push_ready(task.id)
+    
+    def _write_task_files(self, pairs: List[Tuple[Task, Dict[str, Any]]]) -> List[Tuple[Task, Dict[str, Any]]]:
+        """Publish one task file per (task, payload), returning the pairs written successfully."""
+        written = []
+        try:
+            dir_fd = open_dir(self.queue_dir)
+        except OSError:
+            dir_fd = None  # each write below reports its own error
+        try:
+            for task, payload in pairs:
+                name = f"{task.id}{wire.SUFFIX}"
+                try:
+                    atomic_write_bytes(name if dir_fd is not None else self.queue_dir / name,
+                                       wire.encode(payload), dir_fd=dir_fd)
+                except OSError as e:
+                    print(f"Error dispatching task {task.id}: {e}")
+                    continue
+                written.append((task, payload))
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
+        return written
+    
+    def _set_state(self, task_id: str, status: TaskStatus) -> None:
+        """Record a state transition, keeping the per-state counters in sync."""
+        previous = self._task_states.get(task_id)
+        if previous is not None:
+            self._state_counts[previous] -= 1
+        self._task_states[task_id] = status.value
+        self._state_counts[status.value] += 1
+    
+    def state_counts(self) -> Dict[str, int]:
+        """Number of tasks in each state, for tasks dispatched through this router."""
+        return {status.value: self._state_counts[status.value] for status in TaskStatus}
+    
+    def _push_ready(self, task_id: str) -> None:
+        """Hand a task whose dependencies are satisfied to the executor."""
+        if self.mode != "file":
+            self.todo.put(self._scheduled[task_id])
+        else:
+            self._ready.append(task_id)
+    
+    def _release_successors(self, task_id: str) -> None:
+        """Record a finished task and queue the dependents it unblocked."""
+        for child in self._graph.mark_done(task_id):
+            self._push_ready(child)
     
     def monitor_progress(self) -> Dict[str, str]:
         """Check status of all tasks."""
+        if self.mode == "memory" or self._scheduled:
+            # Tasks dispatched by this router are tracked in memory
+            return dict(self._task_states)
+        
+        if self.store is not None:
+            return self.store.statuses()
+        
         progress = {}
-        for task_file in self.queue_dir.glob("*.json"):
-            try:
-                with open(task_file, 'r') as f:
-                    task_data = json.load(f)
-                
-                task_id = task_data.get('id')
-                if task_id:
-                    progress[task_id] = task_data.get('status', 'PENDING')
-            except (json.JSONDecodeError, KeyError, OSError):
-                # Skip malformed or unreadable files
-                continue
+        for _, task_data in self._scan_task_files():
+            if task_data.get('id'):
+                progress[task_data['id']] = task_data.get('status', 'PENDING')
         return progress
     
+    def _scan_task_files(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (path, decoded task) for every task file in queue_dir.
+        
+        Files whose inode, mtime and size are unchanged since the last scan
+        are served from cache rather than re-read, so polling a queue of
+        mostly settled tasks costs one scandir plus a stat per file. Yielded
+        dicts are shared with the cache and must not be modified.
+        """
+        previous, self._file_cache = self._file_cache, {}
+        try:
+            with os.scandir(self.queue_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(wire.SUFFIX):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    
+                    version = (st.st_ino, st.st_mtime_ns, st.st_size)
+                    cached = previous.get(entry.path)
+                    if cached is not None and cached[0] == version:
+                        task_data = cached[1]
+                    else:
+                        task_data = self._read_task_file(entry.path)
+                        if task_data is None:
+                            continue
+                    self._file_cache[entry.path] = (version, task_data)
+                    yield entry.path, task_data
+        except FileNotFoundError:
+            return
+    
+    def _read_task_file(self, task_file: str) -> Optional[Dict[str, Any]]:
+        """Decode a queued task file, or None if it vanished or is corrupt.
+        
+        Task files are only ever replaced atomically, so a decode error means
+        the file itself is bad rather than caught mid-write.
+        """
+        try:
+            return wire.decode(read_file_bytes(task_file))
+        except OSError:
+            return None
+        except wire.DecodeError as e:
+            print(f"Warning: skipping malformed task file {task_file}: {e}")
+            return None
+    
     def is_complete(self, task_ids: List[str]) -> bool:
         """Check if all tasks are done."""
         if not task_ids:
             return True
-            
-        progress = self.monitor_progress()
-        return all(progress.get(tid) == TaskStatus.DONE.value for tid in task_ids)
+        
+        if self.mode == "memory" or self._scheduled:
+            # Cheap check first: while fewer tasks are done than requested
+            # (task IDs are distinct), there is nothing to look up
+            if self._state_counts[TaskStatus.DONE.value] < len(task_ids):
+                return False
+            states = self._task_states
+        elif self.store is not None:
+            return self.store.count_unfinished(task_ids) == 0
+        else:
+            states = self.monitor_progress()
+        return all(states.get(tid) == TaskStatus.DONE.value for tid in task_ids)
     
     def execute_pending_tasks(self) -> None:
         """Execute all pending tasks."""
-        for task_file in self.queue_dir.glob("*.json"):
-            try:
-                with open(task_file, 'r') as f:
-                    task_data = json.load(f)
-                
-                if task_data.get('status') != TaskStatus.PENDING.value:
-                    continue
-                
-                worker_name = task_data.get('worker')
-                if not worker_name:
-                    continue
-                
-                worker_class = get_worker_class(worker_name)
-                worker = worker_class(worker_name, str(self.results_dir))
-                worker.process_task_file(str(task_file))
-                
-            except (json.JSONDecodeError, KeyError, OSError):
-                # Skip malformed or unreadable files
-                continue
-            except Exception as e:
-                print(f"Error executing task from {task_file}: {e}")
+        if self.mode == "memory":
+            self._execute_queued_tasks()
+            return
+        
+        if self.store is not None:
+            if self._scheduled:
+                self._execute_queued_tasks()
+            else:
+                self._execute_stored_tasks()
+            return
+        
+        if self._scheduled:
+            self._execute_ready_files()
+            return
+        
+        # No tasks dispatched through this router: run whatever is queued on disk,
+        # honouring Task.after against the tasks already DONE there
+        graph = TaskGraph()
+        queued: Dict[str, Tuple[str, str]] = {}
+        waiting = []
+        for task_file, task_data in self._scan_task_files():
+            if not task_data.get('id'):
                 continue
+            
+            task_id, status = task_data['id'], task_data.get('status')
+            if status == TaskStatus.DONE.value:
+                graph.mark_done(task_id)
+            elif status == TaskStatus.PENDING.value and task_data.get('worker'):
+                queued[task_id] = (task_data['worker'], task_file)
+                waiting.append((task_id, task_data.get('after') or ()))
+        
+        order = [task_id for task_id, after in waiting if graph.add(task_id, after)]
+        
+        def on_done(index: int, outcome: Outcome) -> List[Tuple[str, str]]:
+            task_id = order[index]
+            if isinstance(outcome, Exception):
+                print(f"Error executing task from {queued[task_id][1]}: {outcome}")
+                return []
+            released = graph.mark_done(task_id)
+            order.extend(released)
+            return [queued[child] for child in released]
+        
+        run_task_files([queued[task_id] for task_id in order], self.max_workers,
+                       str(self.results_dir), on_done)
+    
+    def _execute_stored_tasks(self) -> None:
+        """Run the tasks another router left PENDING in the table, in dependency order.
+        
+        Mirrors the file-mode fallback: rows already DONE satisfy `after`
+        up front, and the rest are released as their dependencies finish.
+        """
+        graph = TaskGraph()
+        for task_id, status in self.store.statuses().items():
+            if status == TaskStatus.DONE.value:
+                graph.mark_done(task_id)
+        
+        queued: Dict[str, Dict[str, Any]] = {}
+        waiting = []
+        for task_data in self.store.pending():
+            queued[task_data['id']] = task_data
+            waiting.append((task_data['id'], task_data.get('after') or ()))
+        
+        order: List[str] = []
+        
+        def start(task_ids: List[str]) -> List[Dict[str, Any]]:
+            if task_ids:
+                self.store.set_status(task_ids, TaskStatus.IN_PROGRESS)
+            order.extend(task_ids)
+            return [queued[task_id] for task_id in task_ids]
+        
+        def on_done(index: int, outcome: Outcome) -> List[Dict[str, Any]]:
+            task_id = order[index]
+            if isinstance(outcome, Exception):
+                self.store.record([(task_id, TaskStatus.ERROR, None)])
+                print(f"Error executing task {task_id}: {outcome}")
+                return []
+            
+            self.completed.put(outcome)
+            self.store.record([(task_id, TaskStatus.DONE, outcome)])
+            return start(graph.mark_done(task_id))
+        
+        ready = [task_id for task_id, after in waiting if graph.add(task_id, after)]
+        run_tasks(start(ready), self.max_workers, str(self.results_dir), on_done)
+    
+    def _take_ready(self) -> List[str]:
+        """Remove and return the IDs of every task waiting in the ready queue."""
+        ready = list(self._ready)
+        self._ready.clear()
+        return ready
+    
+    def _execute_ready_files(self) -> None:
+        """Run ready task files through the worker pool in dependency order.
+        
+        Each finished task feeds the successors it releases straight into the
+        running pool, so a slow task only holds back its own dependents.
+        """
+        ready = self._take_ready()
+        if not ready:
+            return
+        started: List[str] = []
+        
+        def start(task_ids: List[str]) -> List[Tuple[str, str]]:
+            task_files = []
+            for task_id in task_ids:
+                if self._task_states.get(task_id) != TaskStatus.PENDING.value:
+                    continue  # already finished by an external worker
+                self._set_state(task_id, TaskStatus.IN_PROGRESS)
+                started.append(task_id)
+                task_file = self.queue_dir / f"{task_id}{wire.SUFFIX}"
+                task_files.append((self._scheduled[task_id]['worker'], str(task_file)))
+            return task_files
+        
+        def on_done(index: int, outcome: Outcome) -> List[Tuple[str, str]]:
+            task_id = started[index]
+            if isinstance(outcome, Exception):
+                self._set_state(task_id, TaskStatus.ERROR)
+                print(f"Error executing task from {self.queue_dir / f'{task_id}{wire.SUFFIX}'}: {outcome}")
+                return []
+            
+            self._set_state(task_id, TaskStatus.DONE)
+            self._release_successors(task_id)
+            return start(self._take_ready())
+        
+        run_task_files(start(ready), self.max_workers, str(self.results_dir), on_done)
+    
+    def _execute_queued_tasks(self) -> None:
+        """Drain the To-do queue into the worker pool, pushing results to the Completed queue.
+        
+        Successors released by a finished task join the running pool at once,
+        so everything reachable from the current queue executes in this call.
+        """
+        pending = self.todo.drain()
+        if not pending:
+            return
+        started: List[str] = []
+        
+        def start(tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            for task_data in tasks:
+                self._set_state(task_data['id'], TaskStatus.IN_PROGRESS)
+                started.append(task_data['id'])
+            if self.store is not None and tasks:
+                self.store.set_status([t['id'] for t in tasks], TaskStatus.IN_PROGRESS)
+            return tasks
+        
+        def on_done(index: int, outcome: Outcome) -> List[Dict[str, Any]]:
+            task_id = started[index]
+            if isinstance(outcome, Exception):
+                self._set_state(task_id, TaskStatus.ERROR)
+                if self.store is not None:
+                    self.store.record([(task_id, TaskStatus.ERROR, None)])
+                print(f"Error executing task {task_id}: {outcome}")
+                return []
+            
+            self.completed.put(outcome)
+            self._set_state(task_id, TaskStatus.DONE)
+            if self.store is not None:
+                self.store.record([(task_id, TaskStatus.DONE, outcome)])
+            self._release_successors(task_id)
+            return start(self.todo.drain())
+        
+        run_tasks(start(pending), self.max_workers, str(self.results_dir), on_done)
     
     def wait_for_completion(self, task_ids: List[str], timeout: int = 30) -> bool:
         """Wait for tasks to complete with timeout."""
-        start_time = time.time()
+        deadline = time.monotonic() + timeout
         
-        while time.time() - start_time < timeout:
+        while True:
+            self._sync_task_files(task_ids)
             if self.is_complete(task_ids):
                 return True
             self.execute_pending_tasks()
-            time.sleep(1)
+            # Tasks run in process usually finish here; don't sleep before noticing
+            if self.is_complete(task_ids):
+                return True
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._wait_for_change(remaining)
+    
+    def _sync_task_files(self, task_ids: List[str]) -> None:
+        """Pick up completions that external workers wrote to our task files.
         
-        return False
\ No newline at end of file
+        Tasks dispatched through this router are otherwise tracked in memory
+        only, so a task finished by another process would never be noticed.
+        Only tasks still PENDING here are read back from disk.
+        """
+        if self.mode != "file" or not self._scheduled:
+            return
+        for task_id in task_ids:
+            if self._task_states.get(task_id) != TaskStatus.PENDING.value:
+                continue
+            task_data = self._read_task_file(str(self.queue_dir / f"{task_id}{wire.SUFFIX}"))
+            status = task_data.get('status') if task_data else None
+            if status == TaskStatus.DONE.value:
+                self._set_state(task_id, TaskStatus.DONE)
+                self._release_successors(task_id)
+            elif status == TaskStatus.ERROR.value:
+                self._set_state(task_id, TaskStatus.ERROR)
+    
+    def _wait_for_change(self, timeout: float) -> None:
+        """Block until the queue directory changes (or a 1s poll tick without watchdog)."""
+        if self.mode == "file" and self._start_watcher():
+            self._changed.wait(timeout)
+            self._changed.clear()
+        else:
+            time.sleep(min(1.0, timeout))
+    
+    def _start_watcher(self) -> bool:
+        """Start watching queue_dir if watchdog is available; True when watching."""
+        if self._observer is None and Observer is not None:
+            try:
+                observer = Observer()
+                observer.daemon = True
+                observer.schedule(_QueueChangeHandler(self._changed), str(self.queue_dir))
+                observer.start()
+                self._observer = observer
+            except OSError as e:
+                print(f"Error watching queue directory {self.queue_dir}: {e}")
+                self._observer = False  # don't retry on every wait
+        return bool(self._observer)
+    
+    def close(self) -> None:
+        """Stop the queue directory watcher, if one was started."""
+        observer, self._observer = self._observer, None
+        if observer:
+            observer.stop()
+            observer.join()
+    
+    def __enter__(self) -> "Router":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,106 @@
+"""SQLite-backed task queue for the Router's "sqlite" mode."""
+
+import os
+import sqlite3
+import threading
+import orjson
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .models import TaskStatus
+
+_DONE = TaskStatus.DONE.value
+_PENDING = TaskStatus.PENDING.value
+
+
+class TaskStore:
+    """
+    Durable task table shared by every process using the same queue directory.
+    
+    One indexed query replaces a glob plus a decode per task file: progress,
+    completion and pending work are all read straight from the table. The
+    database runs in WAL mode, so pollers never block the writer.
+    """
+    
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self._local = threading.local()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks (id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                "worker TEXT NOT NULL, payload BLOB NOT NULL, result BLOB)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status)")
+            self._local.conn = conn
+        return conn
+    
+    def _executemany(self, sql: str, rows: List[Tuple]) -> None:
+        """Apply a batch of writes as one transaction (the connection autocommits)."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(sql, rows)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    
+    def add(self, tasks: Iterable[Dict[str, Any]]) -> None:
+        """Insert (or re-queue) task payloads in a single transaction."""
+        rows = [
+            (t['id'], _PENDING, t['worker'], orjson.dumps(t, option=orjson.OPT_NON_STR_KEYS))
+            for t in tasks
+        ]
+        self._executemany(
+            "INSERT OR REPLACE INTO tasks (id, status, worker, payload, result) VALUES (?, ?, ?, ?, NULL)",
+            rows
+        )
+    
+    def set_status(self, task_ids: Iterable[str], status: TaskStatus) -> None:
+        """Move a batch of tasks to a new status."""
+        self._executemany("UPDATE tasks SET status = ? WHERE id = ?",
+                          [(status.value, task_id) for task_id in task_ids])
+    
+    def record(self, outcomes: Iterable[Tuple[str, TaskStatus, Optional[Dict[str, Any]]]]) -> None:
+        """Store a wave of (task ID, final status, result payload or None)."""
+        rows = [
+            (status.value, orjson.dumps(result, option=orjson.OPT_NON_STR_KEYS) if result is not None else None, task_id)
+            for task_id, status, result in outcomes
+        ]
+        self._executemany("UPDATE tasks SET status = ?, result = ? WHERE id = ?", rows)
+    
+    def statuses(self) -> Dict[str, str]:
+        """Map every stored task ID to its status."""
+        return dict(self._connect().execute("SELECT id, status FROM tasks"))
+    
+    def count_unfinished(self, task_ids: List[str]) -> int:
+        """Number of task_ids that are not DONE (unknown IDs count as unfinished)."""
+        conn = self._connect()
+        done = 0
+        # Stay under SQLite's bound-parameter limit on large batches
+        for start in range(0, len(task_ids), 500):
+            chunk = task_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            done += conn.execute(
+                f"SELECT COUNT(*) FROM tasks WHERE status = ? AND id IN ({placeholders})",
+                (_DONE, *chunk)
+            ).fetchone()[0]
+        return len(task_ids) - done
+    
+    def pending(self) -> List[Dict[str, Any]]:
+        """Decode the payload of every PENDING task, in insertion order."""
+        rows = self._connect().execute(
+            "SELECT payload FROM tasks WHERE status = ? ORDER BY rowid", (_PENDING,)
+        ).fetchall()
+        return [orjson.loads(payload) for (payload,) in rows]
+    
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get a finished task's result payload (same contract as CompletedQueue.get)."""
+        row = self._connect().execute("SELECT result FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return orjson.loads(row[0]) if row and row[0] is not None else None
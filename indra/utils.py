@@ -1,8 +1,25 @@
 """Simple utilities for Indra."""
 
+import functools
 import os
+import random
+import re
 import logging
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Optional, Set, Union
+from .paths import DEFAULT_QUEUE_DIR, DEFAULT_RESULTS_DIR
+
+_DIGITS_RE = re.compile(r"\d+")
+_WEEK_RE = re.compile(r"week", re.IGNORECASE)
+_MONTH_RE = re.compile(r"month", re.IGNORECASE)
+
+# Directories already created (or found) by ensure_dir in this process
+_ENSURED: Set[str] = set()
+
+# Per-thread random generators handed out by thread_rng
+_rng_local = threading.local()
 
 
 def setup_logging():
@@ -15,10 +32,162 @@ def setup_logging():
 
 def ensure_directories():
     """Create required directories."""
-    for directory in ["queue", "results", "logs"]:
-        Path(directory).mkdir(exist_ok=True)
+    for directory in [DEFAULT_QUEUE_DIR, DEFAULT_RESULTS_DIR, "logs"]:
+        ensure_dir(directory)
+
+
+def ensure_dir(path: Union[str, Path]) -> None:
+    """Create a directory (and parents) once per process; later calls for it are free.
+    
+    A directory removed after its first ensure_dir call is recreated by
+    atomic_write_bytes/append_record when a write into it fails.
+    """
+    key = os.path.normpath(os.fspath(path))
+    if key in _ENSURED:
+        return
+    os.makedirs(key, exist_ok=True)
+    _ENSURED.add(key)
+
+
+def _recreate_parent(path: Union[str, Path]) -> bool:
+    """Recreate path's directory after a write found it missing.
+    
+    Only directories set up through ensure_dir are recreated; returns True
+    if it was one of them, so the write is worth retrying.
+    """
+    parent = os.path.dirname(os.path.normpath(os.fspath(path)))
+    if parent not in _ENSURED:
+        return False
+    _ENSURED.discard(parent)
+    ensure_dir(parent)
+    return True
 
 
 def get_api_key():
     """Get OpenAI API key from environment."""
-    return os.getenv("OPENAI_API_KEY")
\ No newline at end of file
+    return os.getenv("OPENAI_API_KEY")
+
+
+def atomic_write_bytes(path: str, data: bytes, dir_fd: Optional[int] = None) -> None:
+    """Write a pre-serialized blob and atomically replace the file at path.
+    
+    With dir_fd, path is relative to that open directory (see open_dir), which
+    skips resolving the full path twice per file when writing many files into
+    one directory.
+    """
+    try:
+        _write_and_replace(path, data, dir_fd)
+    except FileNotFoundError:
+        # The directory was removed after ensure_dir cached it (e.g. a tmp cleaner)
+        if dir_fd is not None or not _recreate_parent(path):
+            raise
+        _write_and_replace(path, data, dir_fd)
+
+
+def _write_and_replace(path: str, data: bytes, dir_fd: Optional[int]) -> None:
+    tmp_path = f"{path}.tmp"
+    # One unbuffered write() per file rather than many small buffered ones
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644, dir_fd=dir_fd)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path, src_dir_fd=dir_fd, dst_dir_fd=dir_fd)
+
+
+def read_file_bytes(path: Union[str, Path], chunk_size: int = 1 << 16) -> bytes:
+    """Read a whole file with raw os.read() calls.
+    
+    Skips the buffered reader's setup (fstat, isatty probe, seek), which is
+    most of the cost for the small task and result files read in bulk; files
+    smaller than chunk_size take a single read.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        data = os.read(fd, chunk_size)
+        if len(data) < chunk_size:
+            return data
+        chunks = [data]
+        while True:
+            data = os.read(fd, chunk_size)
+            if not data:
+                return b"".join(chunks)
+            chunks.append(data)
+    finally:
+        os.close(fd)
+
+
+def open_dir(path: str) -> Optional[int]:
+    """Open a directory for dir_fd-relative writes, or None where unsupported."""
+    # os.replace shares os.rename's implementation but isn't listed in supports_dir_fd
+    if os.open not in os.supports_dir_fd or os.rename not in os.supports_dir_fd:
+        return None
+    return os.open(path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+
+
+def append_record(path: str, data: bytes) -> None:
+    """Append one record to a shared log with a single O_APPEND write.
+    
+    O_APPEND makes the seek-and-write atomic, so concurrent workers (threads
+    or processes) never interleave records.
+    """
+    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+    try:
+        fd = os.open(path, flags, 0o644)
+    except FileNotFoundError:
+        if not _recreate_parent(path):
+            raise
+        fd = os.open(path, flags, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def utc_isoformat(timestamp: float) -> str:
+    """Format a time.time() value as an ISO-8601 UTC timestamp."""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+def parse_duration_days(duration: Any, default: int = 3) -> int:
+    """Number of days in a free-form duration such as "5 days", "2 weeks" or "1 month".
+    
+    Uses the first number found (default when there is none) and is always at least 1.
+    """
+    return _parse_duration_text(str(duration), default)
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_duration_text(text: str, default: int) -> int:
+    """Cached body of parse_duration_days; plans reuse a handful of duration strings."""
+    match = _DIGITS_RE.search(text)
+    days = int(match.group()) if match else default
+    if _WEEK_RE.search(text):
+        days *= 7
+    elif _MONTH_RE.search(text):
+        days *= 30
+    return max(1, days)
+
+
+def thread_rng() -> random.Random:
+    """A random generator private to the calling thread.
+    
+    Workers are shared across pool threads, so drawing from one generator per
+    thread keeps concurrent tasks off the module-level random state.
+    """
+    rng = getattr(_rng_local, "rng", None)
+    if rng is None:
+        rng = _rng_local.rng = random.Random()
+    return rng
+
+
+def _reset_thread_rngs() -> None:
+    """Drop inherited generators after a fork so child processes reseed."""
+    global _rng_local
+    _rng_local = threading.local()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_thread_rngs)
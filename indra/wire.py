@@ -0,0 +1,50 @@
+"""
+Wire format for queue and result files.
+
+Task and result files are internal to the pipeline, so they can use a binary
+encoding. JSON (via orjson) is the default; set INDRA_WIRE_FORMAT=msgpack to
+write MessagePack instead (requires msgspec, from the `msgpack` extra). Use `indra dump <task-id>` to
+inspect files in either format.
+
+Set INDRA_RESULTS_LOG=1 to have workers append results to a single
+results.ndjson log in the results directory instead of writing one file per
+task; the Compiler then reads it back in one sequential, memory-mapped pass.
+This requires the JSON wire format.
+"""
+
+import os
+import functools
+import orjson
+
+WIRE_FORMAT = os.getenv("INDRA_WIRE_FORMAT", "json")
+
+if WIRE_FORMAT == "json":
+    SUFFIX = ".json"
+    DecodeError = orjson.JSONDecodeError
+    # Bound once at import: encode/decode are direct C calls with no wrapper frame
+    encode = functools.partial(orjson.dumps, option=orjson.OPT_NON_STR_KEYS)
+    decode = orjson.loads
+
+elif WIRE_FORMAT == "msgpack":
+    try:
+        import msgspec
+    except ImportError:
+        raise ImportError(
+            "INDRA_WIRE_FORMAT=msgpack requires msgspec; install it with: pip install 'indra-mvp[msgpack]'"
+        ) from None
+    
+    SUFFIX = ".mp"
+    DecodeError = msgspec.DecodeError
+    # One Encoder/Decoder per process, shared by every worker and thread
+    encode = msgspec.msgpack.Encoder().encode
+    decode = msgspec.msgpack.Decoder().decode
+
+else:
+    raise ValueError(f"Unknown INDRA_WIRE_FORMAT '{WIRE_FORMAT}'. Expected 'json' or 'msgpack'")
+
+# Opt-in: one append-only NDJSON log for all results instead of a file per task
+RESULTS_LOG = os.getenv("INDRA_RESULTS_LOG", "0") == "1"
+RESULTS_LOG_NAME = "results.ndjson"
+
+if RESULTS_LOG and WIRE_FORMAT != "json":
+    raise ValueError("INDRA_RESULTS_LOG=1 requires INDRA_WIRE_FORMAT=json")
@@ -1,68 +1,172 @@
 """Finance Worker - Handles financial calculations with stubbed data."""
 
-import random
+import calendar
+from types import MappingProxyType
 from typing import Dict, Any, List
 from datetime import datetime
 from ..base_worker import BaseWorker, register_worker
+from ..paths import DEFAULT_RESULTS_DIR
+from ..utils import parse_duration_days, thread_rng
+
+# Stubbed reference data, built once per process and shared read-only by every instance
+
+# Cost data for different destinations and categories
+_DESTINATION_MULTIPLIERS = MappingProxyType({
+    "Paris": 1.3,
+    "London": 1.4,
+    "Tokyo": 1.2,
+    "New York": 1.5,
+    "Sydney": 1.1,
+    "Dubai": 1.0,
+    "Singapore": 0.9,
+    "Barcelona": 0.8,
+    "Bangkok": 0.5,
+    "Prague": 0.6,
+    "Budapest": 0.5,
+    "Lisbon": 0.7
+})
+
+# Base daily costs in USD
+_BASE_COSTS = MappingProxyType({
+    "accommodation": {"budget": 60, "mid_range": 150, "luxury": 400},
+    "food": {"budget": 25, "mid_range": 60, "luxury": 120},
+    "transportation": {"budget": 15, "mid_range": 30, "luxury": 80},
+    "activities": {"budget": 20, "mid_range": 50, "luxury": 150},
+    "miscellaneous": {"budget": 10, "mid_range": 25, "luxury": 50}
+})
+
+# Exchange rates (stubbed for demo)
+_EXCHANGE_RATES = MappingProxyType({
+    "USD": 1.0,
+    "EUR": 0.85,
+    "GBP": 0.75,
+    "JPY": 110.0,
+    "AUD": 1.35,
+    "AED": 3.67,
+    "SGD": 1.35
+})
+
+# Base round-trip flight costs in USD by budget category
+_BASE_FLIGHT_COSTS = MappingProxyType({
+    "budget": 400,
+    "mid_range": 700,
+    "luxury": 1200
+})
+
+# The base costs pivoted by budget category, plus each category's daily total
+_BASE_BY_BUDGET = {
+    budget: {category: costs[budget] for category, costs in _BASE_COSTS.items()}
+    for budget in ("budget", "mid_range", "luxury")
+}
+_BASE_SUM_BY_BUDGET = {budget: sum(costs.values()) for budget, costs in _BASE_BY_BUDGET.items()}
+
+# Deterministic part of each flight estimate for the known destinations
+_FLIGHT_BASE = {
+    (destination, budget): cost * multiplier
+    for destination, multiplier in _DESTINATION_MULTIPLIERS.items()
+    for budget, cost in _BASE_FLIGHT_COSTS.items()
+}
+
+# Recommended budget allocation: (category, share of the budget, has a daily limit)
+_ALLOCATION_PERCENTAGES = (
+    ("accommodation", 0.35, True),
+    ("food", 0.25, True),
+    ("transportation", 0.20, True),
+    ("activities", 0.15, True),
+    ("emergency_fund", 0.05, False),
+)
+
+# Static advice text; handlers copy these so callers get their own lists
+_RECOMMENDED_APPS = (
+    "Trail Wallet - Travel expense tracker",
+    "Splitwise - Group expense sharing",
+    "XE Currency - Exchange rates"
+)
+
+_CURRENCY_TIPS = (
+    "Use ATMs for better exchange rates than currency exchange counters",
+    "Notify your bank before traveling to avoid card blocks",
+    "Consider getting a travel credit card with no foreign transaction fees",
+    "Keep some cash for small vendors and tips"
+)
+
+_GENERAL_RECOMMENDATIONS = (
+    "Use travel reward credit cards for bookings",
+    "Compare prices across multiple booking platforms",
+    "Consider travel insurance for protection"
+)
+
+# Fixed tails of the top-5 recommendations, after the figures built per call
+_OVER_BUDGET_RECOMMENDATIONS = (
+    "Book flights in advance for better deals",
+    "Consider traveling during off-peak season",
+    *_GENERAL_RECOMMENDATIONS
+)[:3]
+_UNDER_BUDGET_RECOMMENDATIONS = (
+    "Consider upgrading accommodation or dining experiences",
+    "Budget for souvenirs and unexpected expenses",
+    "Keep 10-15% as emergency fund",
+    *_GENERAL_RECOMMENDATIONS
+)[:4]
+
+_SPENDING_TIPS = (
+    "Download offline maps to avoid roaming charges",
+    "Eat at local restaurants instead of tourist areas",
+    "Use public transportation instead of taxis",
+    "Look for free walking tours and activities",
+    "Book accommodations with kitchen facilities to save on meals"
+)
+
+_DESTINATION_SPENDING_TIPS = MappingProxyType({
+    "Paris": ("Visit museums on first Sunday mornings for free entry", "Buy groceries at Monoprix for better prices"),
+    "London": ("Get an Oyster Card for cheaper tube travel", "Many museums have free admission"),
+    "Tokyo": ("Use convenience stores for affordable meals", "Get a JR Pass for train travel"),
+    "New York": ("Walk instead of taking taxis when possible", "Happy hour deals at restaurants")
+})
+
+# Top 3 spending tips, general ones first, for each destination and the default
+_TOP_SPENDING_TIPS = _SPENDING_TIPS[:3]
+_SPENDING_TIPS_BY_DESTINATION = {
+    destination: (_SPENDING_TIPS + tips)[:3]
+    for destination, tips in _DESTINATION_SPENDING_TIPS.items()
+}
 
 
 @register_worker("finance")
 class FinanceWorker(BaseWorker):
     """Finance worker that handles cost calculations and budgeting."""
     
-    def __init__(self, worker_name: str = "finance", results_dir: str = "results"):
+    # Stubbed data only, so execute() is effectively instant
+    fast_path = True
+    
+    destination_multipliers = _DESTINATION_MULTIPLIERS
+    base_costs = _BASE_COSTS
+    exchange_rates = _EXCHANGE_RATES
+    
+    # Task type aliases -> handler method names
+    _handlers = MappingProxyType({
+        'calculate_trip_cost': '_handle_trip_cost_calculation',
+        'trip_budget': '_handle_trip_cost_calculation',
+        'budget_breakdown': '_handle_budget_breakdown',
+        'expense_breakdown': '_handle_budget_breakdown',
+        'savings_plan': '_handle_savings_planning',
+        'financial_planning': '_handle_savings_planning',
+        'currency_conversion': '_handle_currency_conversion',
+        'exchange_rates': '_handle_currency_conversion',
+    })
+    
+    def __init__(self, worker_name: str = "finance", results_dir: str = DEFAULT_RESULTS_DIR):
         """Initialize the finance worker."""
         super().__init__(worker_name, results_dir)
-        
-        # Cost data for different destinations and categories
-        self.destination_multipliers = {
-            "Paris": 1.3,
-            "London": 1.4,
-            "Tokyo": 1.2,
-            "New York": 1.5,
-            "Sydney": 1.1,
-            "Dubai": 1.0,
-            "Singapore": 0.9,
-            "Barcelona": 0.8,
-            "Bangkok": 0.5,
-            "Prague": 0.6,
-            "Budapest": 0.5,
-            "Lisbon": 0.7
-        }
-        
-        # Base daily costs in USD
-        self.base_costs = {
-            "accommodation": {"budget": 60, "mid_range": 150, "luxury": 400},
-            "food": {"budget": 25, "mid_range": 60, "luxury": 120},
-            "transportation": {"budget": 15, "mid_range": 30, "luxury": 80},
-            "activities": {"budget": 20, "mid_range": 50, "luxury": 150},
-            "miscellaneous": {"budget": 10, "mid_range": 25, "luxury": 50}
-        }
-        
-        # Exchange rates (stubbed for demo)
-        self.exchange_rates = {
-            "USD": 1.0,
-            "EUR": 0.85,
-            "GBP": 0.75,
-            "JPY": 110.0,
-            "AUD": 1.35,
-            "AED": 3.67,
-            "SGD": 1.35
-        }
     
     def execute(self, **inputs) -> Dict[str, Any]:
         """Execute finance-related tasks."""
         task_type = inputs.get('task', 'budget_analysis')
         
         # Route to specific task handlers
-        if task_type in ['calculate_trip_cost', 'trip_budget']:
-            return self._handle_trip_cost_calculation(inputs)
-        elif task_type in ['budget_breakdown', 'expense_breakdown']:
-            return self._handle_budget_breakdown(inputs)
-        elif task_type in ['savings_plan', 'financial_planning']:
-            return self._handle_savings_planning(inputs)
-        elif task_type in ['currency_conversion', 'exchange_rates']:
-            return self._handle_currency_conversion(inputs)
+        handler = self._handlers.get(task_type)
+        if handler is not None:
+            return getattr(self, handler)(inputs)
         else:
             # General financial analysis - simple fallback
             destination = inputs.get('destination', 'Paris')
@@ -104,15 +208,13 @@ class FinanceWorker(BaseWorker):
         # Get destination cost multiplier
         multiplier = self.destination_multipliers.get(destination, 1.0)
         
-        # Calculate costs for each category
-        daily_costs = {}
-        total_estimated_cost = 0
-        
-        for category, costs in self.base_costs.items():
-            base_cost = costs.get(budget_category, costs['mid_range'])
-            adjusted_cost = base_cost * multiplier
-            daily_costs[category] = round(adjusted_cost, 2)
-            total_estimated_cost += adjusted_cost * days
+        # Calculate costs for each category (unknown budget categories price as mid-range)
+        budget_key = budget_category if budget_category in _BASE_BY_BUDGET else 'mid_range'
+        daily_costs = {
+            category: round(base_cost * multiplier, 2)
+            for category, base_cost in _BASE_BY_BUDGET[budget_key].items()
+        }
+        total_estimated_cost = _BASE_SUM_BY_BUDGET[budget_key] * multiplier * days
         
         # Add flight costs (estimated)
         flight_cost = self._estimate_flight_cost(destination, budget_category)
@@ -152,25 +254,13 @@ class FinanceWorker(BaseWorker):
         
         days = self._parse_duration(duration)
         
-        # Recommended budget allocation percentages
-        allocation_percentages = {
-            "accommodation": 0.35,
-            "food": 0.25,
-            "transportation": 0.20,
-            "activities": 0.15,
-            "emergency_fund": 0.05
-        }
-        
-        # Calculate allocations
+        # Calculate allocations and, for the day-to-day categories, daily spending limits
         allocations = {}
-        for category, percentage in allocation_percentages.items():
-            allocations[category] = round(total_budget * percentage, 2)
-        
-        # Daily spending limits
         daily_limits = {}
-        for category in ["accommodation", "food", "transportation", "activities"]:
-            if category in allocations:
-                daily_limits[category] = round(allocations[category] / days, 2)
+        for category, percentage, daily in _ALLOCATION_PERCENTAGES:
+            amount = allocations[category] = round(total_budget * percentage, 2)
+            if daily:
+                daily_limits[category] = round(amount / days, 2)
         
         # Spending tips
         tips = self._generate_spending_tips(destination, total_budget)
@@ -183,11 +273,7 @@ class FinanceWorker(BaseWorker):
             "budget_allocation": allocations,
             "daily_spending_limits": daily_limits,
             "spending_tips": tips,
-            "recommended_apps": [
-                "Trail Wallet - Travel expense tracker",
-                "Splitwise - Group expense sharing",
-                "XE Currency - Exchange rates"
-            ],
+            "recommended_apps": list(_RECOMMENDED_APPS),
             "currency": "USD"
         }
     
@@ -209,15 +295,16 @@ class FinanceWorker(BaseWorker):
             "Sell unused items to boost savings"
         ]
         
-        # Create monthly milestones
-        milestones = []
-        for month in range(1, months_to_save + 1):
-            target = current_savings + (monthly_savings_needed * month)
-            milestones.append({
+        # Create monthly milestones (the monthly amount is the same every month)
+        monthly_save = round(monthly_savings_needed, 2)
+        milestones = [
+            {
                 "month": month,
-                "target_amount": round(target, 2),
-                "monthly_save": round(monthly_savings_needed, 2)
-            })
+                "target_amount": round(current_savings + monthly_savings_needed * month, 2),
+                "monthly_save": monthly_save
+            }
+            for month in range(1, months_to_save + 1)
+        ]
         
         return {
             "task_type": "savings_planning",
@@ -225,14 +312,27 @@ class FinanceWorker(BaseWorker):
             "current_savings": current_savings,
             "amount_needed": round(amount_needed, 2),
             "months_to_save": months_to_save,
-            "monthly_savings_needed": round(monthly_savings_needed, 2),
+            "monthly_savings_needed": monthly_save,
             "weekly_savings_needed": round(monthly_savings_needed / 4, 2),
             "daily_savings_needed": round(monthly_savings_needed / 30, 2),
             "savings_strategies": strategies,
             "monthly_milestones": milestones,
-            "completion_date": datetime.now().replace(month=datetime.now().month + months_to_save).strftime("%Y-%m-%d") if months_to_save <= 12 else "Future date"
+            "completion_date": self._months_from_now(months_to_save)
         }
     
+    @staticmethod
+    def _months_from_now(months: int) -> str:
+        """Today's date moved forward by whole months, as YYYY-MM-DD.
+        
+        Plain integer arithmetic, so any horizon works (no 12-month cliff); the
+        day is clamped to the length of the target month.
+        """
+        now = datetime.now()
+        years, month_index = divmod(now.month - 1 + months, 12)
+        year, month = now.year + years, month_index + 1
+        day = min(now.day, calendar.monthrange(year, month)[1])
+        return f"{year:04d}-{month:02d}-{day:02d}"
+    
     def _handle_currency_conversion(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """Handle currency conversion and exchange rate information."""
         amount = inputs.get('amount', 1000)
@@ -248,14 +348,6 @@ class FinanceWorker(BaseWorker):
         usd_amount = amount / from_rate
         converted_amount = usd_amount * to_rate
         
-        # Generate currency tips
-        tips = [
-            "Use ATMs for better exchange rates than currency exchange counters",
-            "Notify your bank before traveling to avoid card blocks",
-            "Consider getting a travel credit card with no foreign transaction fees",
-            "Keep some cash for small vendors and tips"
-        ]
-        
         return {
             "task_type": "currency_conversion",
             "original_amount": amount,
@@ -264,93 +356,42 @@ class FinanceWorker(BaseWorker):
             "converted_amount": round(converted_amount, 2),
             "exchange_rate": round(to_rate / from_rate, 4),
             "destination": destination,
-            "currency_tips": tips,
+            "currency_tips": list(_CURRENCY_TIPS),
             "last_updated": datetime.now().isoformat()
         }
     
     def _parse_duration(self, duration: str) -> int:
         """Parse duration string to extract number of days."""
-        try:
-            # Extract numbers from duration string
-            numbers = ''.join(filter(str.isdigit, duration))
-            days = int(numbers) if numbers else 3
-            
-            # Adjust if it seems to be weeks or months
-            if 'week' in duration.lower():
-                days *= 7
-            elif 'month' in duration.lower():
-                days *= 30
-                
-            return max(1, days)  # Ensure at least 1 day
-        except:
-            return 3  # Default fallback
+        return parse_duration_days(duration)
     
     def _estimate_flight_cost(self, destination: str, budget_category: str) -> float:
         """Estimate flight costs based on destination and budget category."""
-        base_flight_costs = {
-            "budget": 400,
-            "mid_range": 700,
-            "luxury": 1200
-        }
-        
-        base_cost = base_flight_costs.get(budget_category, 700)
-        multiplier = self.destination_multipliers.get(destination, 1.0)
+        base = _FLIGHT_BASE.get((destination, budget_category))
+        if base is None:
+            base = _BASE_FLIGHT_COSTS.get(budget_category, 700) * self.destination_multipliers.get(destination, 1.0)
         
         # Add some randomness for realism
-        variation = random.uniform(0.8, 1.2)
+        variation = thread_rng().uniform(0.8, 1.2)
         
-        return round(base_cost * multiplier * variation, 2)
+        return round(base * variation, 2)
     
     def _generate_budget_recommendations(self, total_budget: float, estimated_cost: float, 
                                        budget_category: str, days: int) -> List[str]:
-        """Generate personalized budget recommendations."""
-        recommendations = []
-        
+        """Generate personalized budget recommendations (the top 5)."""
         if estimated_cost > total_budget:
             overage = estimated_cost - total_budget
-            recommendations.extend([
+            recommendations = [
                 f"Consider reducing trip duration by {max(1, int(overage / (estimated_cost / days)))} days",
                 f"Look for budget accommodations to save ~${overage * 0.4:.0f}",
-                "Book flights in advance for better deals",
-                "Consider traveling during off-peak season"
-            ])
+            ]
+            recommendations.extend(_OVER_BUDGET_RECOMMENDATIONS)
         else:
             surplus = total_budget - estimated_cost
-            recommendations.extend([
-                f"You have ${surplus:.0f} extra budget for activities or upgrades",
-                "Consider upgrading accommodation or dining experiences",
-                "Budget for souvenirs and unexpected expenses",
-                "Keep 10-15% as emergency fund"
-            ])
-        
-        # General recommendations
-        recommendations.extend([
-            "Use travel reward credit cards for bookings",
-            "Compare prices across multiple booking platforms",
-            "Consider travel insurance for protection"
-        ])
+            recommendations = [f"You have ${surplus:.0f} extra budget for activities or upgrades"]
+            recommendations.extend(_UNDER_BUDGET_RECOMMENDATIONS)
         
-        return recommendations[:5]  # Return top 5 recommendations
+        return recommendations
     
     def _generate_spending_tips(self, destination: str, budget: float) -> List[str]:
-        """Generate destination-specific spending tips."""
-        tips = [
-            "Download offline maps to avoid roaming charges",
-            "Eat at local restaurants instead of tourist areas",
-            "Use public transportation instead of taxis",
-            "Look for free walking tours and activities",
-            "Book accommodations with kitchen facilities to save on meals"
-        ]
-        
-        # Add destination-specific tips
-        destination_tips = {
-            "Paris": ["Visit museums on first Sunday mornings for free entry", "Buy groceries at Monoprix for better prices"],
-            "London": ["Get an Oyster Card for cheaper tube travel", "Many museums have free admission"],
-            "Tokyo": ["Use convenience stores for affordable meals", "Get a JR Pass for train travel"],
-            "New York": ["Walk instead of taking taxis when possible", "Happy hour deals at restaurants"]
-        }
-        
-        if destination in destination_tips:
-            tips.extend(destination_tips[destination])
-        
-        return tips[:3]  # Return top 3 tips
\ No newline at end of file
+        """Generate destination-specific spending tips (the top 3)."""
+        return list(_SPENDING_TIPS_BY_DESTINATION.get(destination, _TOP_SPENDING_TIPS))
\ No newline at end of file
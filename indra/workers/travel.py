@@ -1,33 +1,57 @@
 """Travel Worker - Handles travel-related tasks with stubbed data."""
 
-import random
+from types import MappingProxyType
 from typing import Dict, Any
 from datetime import datetime, timedelta
 from ..base_worker import BaseWorker, register_worker
+from ..paths import DEFAULT_RESULTS_DIR
+from ..utils import parse_duration_days, thread_rng
+
+_CITIES = MappingProxyType({
+    "Paris": {"country": "France", "timezone": "CET", "currency": "EUR"},
+    "London": {"country": "UK", "timezone": "GMT", "currency": "GBP"},
+    "Tokyo": {"country": "Japan", "timezone": "JST", "currency": "JPY"},
+    "New York": {"country": "USA", "timezone": "EST", "currency": "USD"},
+    "Sydney": {"country": "Australia", "timezone": "AEST", "currency": "AUD"},
+    "Dubai": {"country": "UAE", "timezone": "GST", "currency": "AED"},
+    "Singapore": {"country": "Singapore", "timezone": "SGT", "currency": "SGD"},
+    "Barcelona": {"country": "Spain", "timezone": "CET", "currency": "EUR"},
+})
+_AIRLINES = ("Air France", "British Airways", "Emirates", "Singapore Airlines", "Lufthansa", "Delta", "United")
+_HOTEL_CHAINS = ("Hilton", "Marriott", "Hyatt", "InterContinental", "Radisson", "Sheraton", "Westin")
+_FLIGHT_STOPS = (0, 1, 2)
+_FLIGHT_CLASSES = ("Economy", "Premium Economy", "Business")
+_HOTEL_AMENITIES = (
+    "Free WiFi", "Pool", "Gym", "Spa", "Restaurant",
+    "Room Service", "Business Center", "Parking", "Airport Shuttle"
+)
 
 
 @register_worker("travel")
 class TravelWorker(BaseWorker):
     """Travel worker that handles travel-related tasks."""
     
-    def __init__(self, worker_name: str = "travel", results_dir: str = "results"):
+    # Stubbed data only, so execute() is effectively instant
+    fast_path = True
+    
+    # Stubbed data for demonstrations, shared read-only by every instance
+    cities = _CITIES
+    airlines = _AIRLINES
+    hotel_chains = _HOTEL_CHAINS
+    
+    # Task type aliases -> handler method names
+    _handlers = MappingProxyType({
+        'find_flights': '_handle_flight_search',
+        'flight_search': '_handle_flight_search',
+        'find_hotels': '_handle_hotel_search',
+        'hotel_search': '_handle_hotel_search',
+        'travel_planning': '_handle_travel_planning',
+        'plan_itinerary': '_handle_travel_planning',
+    })
+    
+    def __init__(self, worker_name: str = "travel", results_dir: str = DEFAULT_RESULTS_DIR):
         """Initialize the travel worker."""
         super().__init__(worker_name, results_dir)
-        
-        # Stubbed data for demonstrations
-        self.cities = {
-            "Paris": {"country": "France", "timezone": "CET", "currency": "EUR"},
-            "London": {"country": "UK", "timezone": "GMT", "currency": "GBP"},
-            "Tokyo": {"country": "Japan", "timezone": "JST", "currency": "JPY"},
-            "New York": {"country": "USA", "timezone": "EST", "currency": "USD"},
-            "Sydney": {"country": "Australia", "timezone": "AEST", "currency": "AUD"},
-            "Dubai": {"country": "UAE", "timezone": "GST", "currency": "AED"},
-            "Singapore": {"country": "Singapore", "timezone": "SGT", "currency": "SGD"},
-            "Barcelona": {"country": "Spain", "timezone": "CET", "currency": "EUR"},
-        }
-        
-        self.airlines = ["Air France", "British Airways", "Emirates", "Singapore Airlines", "Lufthansa", "Delta", "United"]
-        self.hotel_chains = ["Hilton", "Marriott", "Hyatt", "InterContinental", "Radisson", "Sheraton", "Westin"]
     
     def execute(self, **inputs) -> Dict[str, Any]:
         """Execute travel-related tasks."""
@@ -40,12 +64,9 @@ class TravelWorker(BaseWorker):
             destination = 'Paris'  # Default fallback
         
         # Route to specific task handlers
-        if task_type in ['find_flights', 'flight_search']:
-            return self._handle_flight_search(inputs)
-        elif task_type in ['find_hotels', 'hotel_search']:
-            return self._handle_hotel_search(inputs)
-        elif task_type in ['travel_planning', 'plan_itinerary']:
-            return self._handle_travel_planning(inputs)
+        handler = self._handlers.get(task_type)
+        if handler is not None:
+            return getattr(self, handler)(inputs)
         else:
             # General travel task - provide simple stubbed data
             return {
@@ -75,33 +96,39 @@ class TravelWorker(BaseWorker):
         duration = inputs.get('duration', '3 days')
         
         # Generate stubbed flight options
-        flights = []
-        for i in range(3):  # Generate 3 flight options
-            airline = random.choice(self.airlines)
-            price = random.randint(300, 1200)
-            departure_time = datetime.now() + timedelta(days=random.randint(1, 30))
-            
-            flights.append({
+        now = datetime.now()
+        count = 3  # Generate 3 flight options, drawing each categorical field in one call
+        # Prices are independent draws, so sorting them up front yields the
+        # flights already ordered by price
+        rng = thread_rng()
+        randint = rng.randint  # bound once: several draws per flight
+        prices = sorted(randint(300, 1200) for _ in range(count))
+        flights = [
+            {
                 "airline": airline,
-                "flight_number": f"{airline[:2].upper()}{random.randint(100, 999)}",
+                "flight_number": f"{airline[:2].upper()}{randint(100, 999)}",
                 "departure_city": departure_city,
                 "destination": destination,
-                "departure_time": departure_time.strftime("%Y-%m-%d %H:%M"),
-                "duration": f"{random.randint(2, 12)}h {random.randint(0, 59)}m",
+                "departure_time": (now + timedelta(days=randint(1, 30))).strftime("%Y-%m-%d %H:%M"),
+                "duration": f"{randint(2, 12)}h {randint(0, 59)}m",
                 "price": price,
                 "currency": "USD",
-                "stops": random.choice([0, 1, 2]),
-                "class": random.choice(["Economy", "Premium Economy", "Business"])
-            })
-        
-        # Sort by price
-        flights.sort(key=lambda x: x['price'])
+                "stops": stops,
+                "class": flight_class
+            }
+            for price, airline, stops, flight_class in zip(
+                prices,
+                rng.choices(self.airlines, k=count),
+                rng.choices(_FLIGHT_STOPS, k=count),
+                rng.choices(_FLIGHT_CLASSES, k=count)
+            )
+        ]
         
         return {
             "task_type": "flight_search",
             "destination": destination,
             "departure_city": departure_city,
-            "search_date": datetime.now().isoformat(),
+            "search_date": now.isoformat(),
             "flights": flights,
             "recommendation": f"Best value flight: {flights[0]['airline']} {flights[0]['flight_number']} for ${flights[0]['price']}",
             "total_options": len(flights)
@@ -114,14 +141,7 @@ class TravelWorker(BaseWorker):
         budget_range = inputs.get('budget_range', 'mid-range')
         
         # Parse duration to get number of nights
-        nights = 3  # default
-        if duration and 'day' in duration.lower():
-            try:
-                nights = int(''.join(filter(str.isdigit, duration)))
-                if nights <= 0:
-                    nights = 3
-            except (ValueError, TypeError):
-                nights = 3
+        nights = parse_duration_days(duration)
         
         # Generate price range based on budget
         price_ranges = {
@@ -132,28 +152,31 @@ class TravelWorker(BaseWorker):
         price_min, price_max = price_ranges.get(budget_range, price_ranges['mid-range'])
         
         # Generate stubbed hotel options
-        hotels = []
-        for i in range(4):  # Generate 4 hotel options
-            chain = random.choice(self.hotel_chains)
-            price_per_night = random.randint(price_min, price_max)
-            
-            hotels.append({
+        count = 4  # Generate 4 hotel options
+        location = f"{destination} City Center"
+        # Bound once: the comprehension makes several draws per hotel
+        rng = thread_rng()
+        uniform, randint, sample = rng.uniform, rng.randint, rng.sample
+        # Highest rating first, drawn and ordered before any hotel is built
+        ratings = sorted((round(uniform(3.5, 5.0), 1) for _ in range(count)), reverse=True)
+        hotels = [
+            {
                 "name": f"{chain} {destination}",
                 "chain": chain,
-                "rating": round(random.uniform(3.5, 5.0), 1),
+                "rating": rating,
                 "price_per_night": price_per_night,
                 "total_price": price_per_night * nights,
                 "currency": "USD",
-                "location": f"{destination} City Center",
-                "amenities": random.sample([
-                    "Free WiFi", "Pool", "Gym", "Spa", "Restaurant", 
-                    "Room Service", "Business Center", "Parking", "Airport Shuttle"
-                ], k=random.randint(3, 6)),
-                "distance_to_center": f"{random.uniform(0.1, 5.0):.1f} km"
-            })
-        
-        # Sort by rating
-        hotels.sort(key=lambda x: x['rating'], reverse=True)
+                "location": location,
+                "amenities": sample(_HOTEL_AMENITIES, k=randint(3, 6)),
+                "distance_to_center": f"{uniform(0.1, 5.0):.1f} km"
+            }
+            for rating, chain, price_per_night in zip(
+                ratings,
+                rng.choices(self.hotel_chains, k=count),
+                [randint(price_min, price_max) for _ in range(count)]
+            )
+        ]
         
         return {
             "task_type": "hotel_search",
@@ -172,12 +195,12 @@ class TravelWorker(BaseWorker):
         destination = inputs.get('destination', 'Paris')
         duration = inputs.get('duration', '3 days')
         
-        # Get city information
-        city_info = self.cities.get(destination, {
+        # Get city information (copied: the table is shared by every task)
+        city_info = dict(self.cities.get(destination, {
             "country": "Unknown",
             "timezone": "UTC",
             "currency": "USD"
-        })
+        }))
         
         # Generate itinerary suggestions
         activities = [
@@ -191,26 +214,29 @@ class TravelWorker(BaseWorker):
             "Experience local nightlife and entertainment"
         ]
         
-        # Generate weather forecast (stubbed)
+        # Generate weather forecast (stubbed); only the 5 days returned are drawn
         weather_conditions = ["Sunny", "Partly Cloudy", "Cloudy", "Light Rain", "Clear"]
-        weather = []
-        for i in range(7):  # 7-day forecast
-            date = datetime.now() + timedelta(days=i)
-            weather.append({
-                "date": date.strftime("%Y-%m-%d"),
-                "condition": random.choice(weather_conditions),
-                "high": random.randint(15, 30),
-                "low": random.randint(5, 20),
-                "humidity": random.randint(40, 80)
-            })
+        today = datetime.now()
+        rng = thread_rng()
+        randint = rng.randint
+        weather = [
+            {
+                "date": (today + timedelta(days=i)).strftime("%Y-%m-%d"),
+                "condition": condition,
+                "high": randint(15, 30),
+                "low": randint(5, 20),
+                "humidity": randint(40, 80)
+            }
+            for i, condition in enumerate(rng.choices(weather_conditions, k=5))
+        ]
         
         return {
             "task_type": "travel_planning",
             "destination": destination,
             "duration": duration,
             "city_info": city_info,
-            "suggested_activities": random.sample(activities, k=min(5, len(activities))),
-            "weather_forecast": weather[:5],  # 5-day forecast
+            "suggested_activities": rng.sample(activities, k=min(5, len(activities))),
+            "weather_forecast": weather,  # 5-day forecast
             "local_tips": [
                 f"Best time to visit {destination} is during spring and fall",
                 f"Local currency is {city_info['currency']}",
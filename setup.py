@@ -1,4 +1,4 @@
-from setuptools import setup, find_packages
+from setuptools import setup
 
 with open("requirements.txt") as f:
     requirements = f.read().splitlines()
@@ -8,19 +8,20 @@ setup(
     version="0.1.0",
     description="AI Agent Orchestration Framework - MVP",
     author="Mehul - Five Labs",
-    packages=find_packages(),
+    packages=["indra", "indra.workers"],
     install_requires=requirements,
+    extras_require={
+        "msgpack": ["msgspec"],
+    },
     entry_points={
         "console_scripts": [
             "indra=indra.cli:main",
         ],
     },
-    python_requires=">=3.8",
+    python_requires=">=3.10",
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
-        "Programming Language :: Python :: 3.8",
-        "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
     ],
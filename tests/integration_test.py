@@ -13,9 +13,35 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 import json
+import os
 import tempfile
+from types import SimpleNamespace
 from unittest.mock import Mock, patch
 
+# Keep scratch queues and results in memory (tmpfs) where the platform has one
+_TMP_ROOT = "/dev/shm" if os.access("/dev/shm", os.W_OK | os.X_OK) else None
+
+
+def _chat_response(content):
+    """A chat completion response whose first choice carries content."""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _fake_client(response):
+    """A stand-in OpenAI client whose chat completions always return response.
+    
+    For tests that don't inspect calls; use Mock where call counts or side
+    effects matter.
+    """
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **_: response)))
+
+
+def _count_json(directory):
+    """Number of .json files in directory, from one scandir pass."""
+    with os.scandir(directory) as entries:
+        return sum(1 for entry in entries if entry.name.endswith(".json"))
+
+
 def test_complete_workflow():
     """Test the complete workflow from end to end."""
     print("🧪 Testing Complete Workflow Integration...")
@@ -25,12 +51,8 @@ def test_complete_workflow():
     from indra.compiler import Compiler
     from indra.models import Task, TaskStatus
     
-    # Mock OpenAI client
-    mock_client = Mock()
-    mock_response = Mock()
-    mock_response.choices = [Mock()]
-    mock_response.choices[0].message = Mock()
-    mock_response.choices[0].message.content = '''[
+    # Stub OpenAI client
+    mock_response = _chat_response('''[
         {
             "task": "research_destination",
             "worker": "travel",
@@ -41,10 +63,10 @@ def test_complete_workflow():
             "worker": "finance", 
             "inputs": {"destination": "Paris", "budget": 2000}
         }
-    ]'''
-    mock_client.chat.completions.create.return_value = mock_response
+    ]''')
+    mock_client = _fake_client(mock_response)
     
-    with tempfile.TemporaryDirectory() as temp_dir:
+    with tempfile.TemporaryDirectory(dir=_TMP_ROOT) as temp_dir:
         # Initialize components
         queen = Queen(mock_client)
         router = Router(
@@ -64,16 +86,14 @@ def test_complete_workflow():
         router.dispatch_tasks(tasks)
         
         # Verify tasks were dispatched
-        queue_files = list(Path(temp_dir, "queue").glob("*.json"))
-        assert len(queue_files) == 2
+        assert _count_json(Path(temp_dir, "queue")) == 2
         print("✅ Task dispatch works")
         
         # Step 3: Execute tasks (simulate)
         router.execute_pending_tasks()
         
         # Verify results were created
-        result_files = list(Path(temp_dir, "results").glob("*.json"))
-        assert len(result_files) == 2
+        assert _count_json(Path(temp_dir, "results")) == 2
         print("✅ Task execution works")
         
         # Step 4: Check completion
@@ -81,6 +101,28 @@ def test_complete_workflow():
         assert completed == True
         print("✅ Completion detection works")
         
+        # A router watching the queue from outside sees status changes and
+        # removals even though unchanged files are served from its cache
+        observer = Router(queue_dir=str(Path(temp_dir) / "queue"), results_dir=str(Path(temp_dir) / "results"))
+        assert observer.monitor_progress() == {tid: "DONE" for tid in task_ids}
+        stale_file = Path(temp_dir, "queue", f"{task_ids[0]}.json")
+        stale_file.write_bytes(stale_file.read_bytes().replace(b'"DONE"', b'"ERROR"'))
+        Path(temp_dir, "queue", f"{task_ids[1]}.json").unlink()
+        assert observer.monitor_progress() == {task_ids[0]: "ERROR"}
+        print("✅ Queue status cache works")
+        
+        # Tasks this router dispatched but an external worker finished are
+        # picked up from their task files instead of being run again
+        with Router(queue_dir=str(Path(temp_dir) / "ext-queue"),
+                    results_dir=str(Path(temp_dir) / "ext-results")) as external:
+            ext_task = Task(id="ext-1", task="find_flights", worker="travel")
+            external.dispatch_tasks([ext_task])
+            ext_file = Path(temp_dir, "ext-queue", "ext-1.json")
+            ext_file.write_bytes(ext_file.read_bytes().replace(b'"PENDING"', b'"DONE"'))
+            assert external.wait_for_completion(["ext-1"], timeout=5)
+            assert _count_json(Path(temp_dir, "ext-results")) == 0
+        print("✅ External completion detection works")
+        
         # Step 5: Compile results
         compiled_data = compiler.compile_results(task_ids)
         assert compiled_data["completed_tasks"] == 2
@@ -117,14 +159,11 @@ def test_beescript_workflow():
     print("\n🧪 Testing BeeScript Workflow...")
     
     from indra.queen import Queen
-    from indra.beescript import BeeScriptExecutor, BeeScriptValidator
+    from indra.beescript import BeeScriptExecutor, BeeScriptValidator, parse_beescript
     
     # Mock OpenAI client for BeeScript generation
     mock_client = Mock()
-    mock_response = Mock()
-    mock_response.choices = [Mock()]
-    mock_response.choices[0].message = Mock()
-    mock_response.choices[0].message.content = '''{
+    mock_response = _chat_response('''{
         "goal": "Plan a trip to Tokyo",
         "budget_credits": 100,
         "timeout_minutes": 10,
@@ -147,11 +186,17 @@ def test_beescript_workflow():
                 "retry_max": 3
             }
         ]
-    }'''
+    }''')
     mock_client.chat.completions.create.return_value = mock_response
     
     queen = Queen(mock_client)
     
+    # Prompt templates render exactly as str.format would
+    from indra.queen import _render
+    for template in ["{a!r:>8} {b:.2f} {{c}}", "{d[0]} {b:{w}}"]:
+        values = {"a": "x", "b": 3.14159, "d": [7], "w": 6}
+        assert _render(template, **values) == template.format(**values)
+    
     # Generate BeeScript
     script = queen.generate_beescript("Plan a trip to Tokyo", budget_credits=100)
     assert script.goal == "Plan a trip to Tokyo"
@@ -164,12 +209,124 @@ def test_beescript_workflow():
     assert is_valid == True
     print("✅ BeeScript validation works")
     
+    # Repair drops the dependency that closes a cycle and keeps the rest
+    cyclic = parse_beescript({"goal": "Loop", "budget_credits": 100, "subtasks": [
+        {"id": "a", "agent": "travel", "task": "find_flights", "after": ["c"]},
+        {"id": "b", "agent": "travel", "task": "find_hotels", "after": ["a"]},
+        {"id": "c", "agent": "finance", "task": "budget_breakdown", "after": ["b"]}
+    ]})
+    assert not validator.validate(cyclic)
+    repaired = queen._attempt_script_repair(cyclic)
+    assert validator.validate(repaired)
+    assert [task.after for task in repaired.subtasks] == [[], ["a"], ["b"]]
+    print("✅ BeeScript cycle repair works")
+    
+    # A null task ID parses and is repaired rather than crashing the parser
+    unnamed = parse_beescript({"goal": "Trip", "budget_credits": 100, "subtasks": [
+        {"id": None, "agent": "travel", "task": "find_flights"}
+    ]})
+    assert not validator.validate(unnamed)
+    assert validator.validate(queen._attempt_script_repair(unnamed))
+    print("✅ BeeScript missing-ID repair works")
+    
+    # Non-string fields are reported as errors, not raised
+    mistyped = parse_beescript({"goal": "Trip", "budget_credits": 100, "subtasks": [
+        {"id": 5, "agent": "travel", "task": "find_flights"},
+        {"id": "b", "agent": ["travel"], "task": 7}
+    ]})
+    assert not validator.validate(mistyped)
+    assert len(validator.errors) == 3
+    
     # Get execution order
     executor = BeeScriptExecutor()
     execution_order = executor.get_execution_order(script)
     expected_order = [["research"], ["flights"]]
     assert execution_order == expected_order
     print("✅ BeeScript execution order works")
+    
+    # Ready tasks are released as dependencies complete, including subtasks
+    # appended after scheduling started
+    from indra.beescript import BeeScriptTask, TaskStatus
+    script = parse_beescript(mock_response.choices[0].message.content)
+    assert [t.id for t in executor.get_ready_tasks(script)] == ["research"]
+    executor.mark_task_completed(script, "research", {}, 20)
+    assert [t.id for t in executor.get_ready_tasks(script)] == ["flights"]
+    script.subtasks.append(BeeScriptTask(id="hotels", agent="travel", task="find_hotels",
+                                         params={}, after=["flights"]))
+    assert executor.get_ready_tasks(script) == []
+    executor.mark_task_completed(script, "flights", {}, 30)
+    assert [t.id for t in executor.get_ready_tasks(script)] == ["hotels"]
+    
+    # Setting a status directly releases dependents too
+    direct = parse_beescript(mock_response.choices[0].message.content)
+    assert [t.id for t in executor.get_ready_tasks(direct)] == ["research"]
+    direct.subtasks[0].status = TaskStatus.COMPLETED
+    assert [t.id for t in executor.get_ready_tasks(direct)] == ["flights"]
+    print("✅ BeeScript ready-task release works")
+    
+    # Statuses keep their string values through serialization
+    from indra.beescript import TaskStatus, beescript_to_dict
+    assert TaskStatus.COMPLETED.value == "COMPLETED"
+    data = json.loads(json.dumps(beescript_to_dict(script)))
+    assert [t["status"] for t in data["subtasks"]] == ["COMPLETED", "COMPLETED", "READY"]
+    assert [t.id for t in parse_beescript(data).subtasks] == ["research", "flights", "hotels"]
+    print("✅ BeeScript status serialization works")
+    
+    # Batch generation: one call for several prompts, missing scripts regenerated singly
+    single_script = mock_response.choices[0].message.content
+    batch_response = _chat_response(f"[{single_script}]")
+    mock_client.chat.completions.create.reset_mock()
+    mock_client.chat.completions.create.side_effect = [batch_response, mock_response]
+    
+    scripts = queen.generate_beescripts_batch(["Plan a trip to Tokyo", "Plan it again"])
+    assert [len(s.subtasks) for s in scripts] == [2, 2]
+    assert mock_client.chat.completions.create.call_count == 2
+    print("✅ Batched BeeScript generation works")
+    
+    # Batch API round trip: submit JSONL, then parse the output file
+    mock_client.files.create.return_value = Mock(id="file-in")
+    mock_client.batches.create.return_value = Mock(id="batch-1")
+    batch_id = queen.submit_beescripts_batch(["Plan a trip to Tokyo", "Plan it again"])
+    assert batch_id == "batch-1"
+    
+    output_line = json.dumps({
+        "custom_id": "p1",
+        "response": {"status_code": 200, "body": {"choices": [{"message": {"content": single_script}}]}}
+    })
+    mock_client.batches.retrieve.return_value = Mock(
+        status="completed", output_file_id="file-out", request_counts=Mock(total=2)
+    )
+    mock_client.files.content.return_value = Mock(content=output_line.encode())
+    fetched = queen.fetch_beescripts(batch_id)
+    assert fetched[0] is None and len(fetched[1].subtasks) == 2
+    mock_client.batches.retrieve.return_value.request_counts = None
+    assert len(queen.fetch_beescripts(batch_id)) == 2
+    print("✅ Batch API BeeScript generation works")
+    
+    # Plan cache: a repeated prompt reuses the stored plan without a chat call
+    from indra.plan_cache import PlanCache
+    with tempfile.TemporaryDirectory(dir=_TMP_ROOT) as temp_dir:
+        cache_client = Mock()
+        cache_client.embeddings.create.return_value = Mock(data=[Mock(embedding=[0.1, 0.7, 0.2])])
+        cache_client.chat.completions.create.return_value = mock_response
+        cached_queen = Queen(cache_client, plan_cache=PlanCache(cache_dir=temp_dir))
+        
+        first = cached_queen.generate_beescript("Plan a trip to Tokyo", budget_credits=100)
+        second = cached_queen.generate_beescript("Plan a trip to Tokyo", budget_credits=100)
+        assert [t.id for t in second.subtasks] == [t.id for t in first.subtasks]
+        assert cache_client.chat.completions.create.call_count == 1
+    print("✅ BeeScript plan cache works")
+    
+    # Hedged async attempts: an invalid first response doesn't fail the call
+    import asyncio
+    from unittest.mock import AsyncMock
+    invalid_response = _chat_response('{"goal": "", "budget_credits": 100, "subtasks": []}')
+    async_client = Mock()
+    async_client.chat.completions.create = AsyncMock(side_effect=[invalid_response, mock_response, mock_response])
+    async_queen = Queen(Mock(), async_client=async_client)
+    script = asyncio.run(async_queen.generate_beescript_async("Plan a trip to Tokyo", hedge_delay=0))
+    assert len(script.subtasks) == 2
+    print("✅ Hedged async BeeScript generation works")
 
 def test_memory_and_credits():
     """Test memory and credit systems."""
@@ -188,6 +345,73 @@ def test_memory_and_credits():
     
     stats = memory.get_stats()
     assert stats["total_entries"] == 2
+    
+    # Least recently used entry is evicted at capacity
+    lru = WorkflowMemory("test-lru", max_entries=2)
+    lru.store("a", 1)
+    lru.store("b", 2)
+    lru.retrieve("a")
+    lru.store("c", 3)
+    assert lru.list_keys() == ["a", "c"]
+    assert memory.get_by_agent("finance") == {"budget": 3000}
+    memory.store("budget", 2500, task_id="task3", agent="finance")
+    assert memory.get_by_task("task2") == {}
+    assert memory.get_by_task("task3") == {"budget": 2500}
+    assert list(memory.iter_by_agent("travel")) == [("destination", "Tokyo")]
+    
+    # Evicted sessions are persisted in the background and can be reloaded
+    from indra.memory import MemoryManager
+    with tempfile.TemporaryDirectory(dir=_TMP_ROOT) as temp_dir:
+        manager = MemoryManager(storage_dir=temp_dir, max_sessions=1)
+        manager.create_session("old").store("city", "Kyoto")
+        manager.create_session("new")
+        assert manager.get_session("old") is None
+        assert manager.load_session("old").retrieve("city") == "Kyoto"
+        manager.flush()
+        assert (Path(temp_dir) / "old.json").exists()
+        
+        # Only sessions changed since their last save are rewritten
+        assert manager.persist_dirty_sessions() == 1
+        assert manager.persist_dirty_sessions() == 0
+        manager.get_session("old").store("city", "Osaka")
+        assert manager.persist_dirty_sessions() == 1
+        
+        # Cleanup checkpoints the sessions it keeps
+        manager.get_session("old").store("city", "Nara")
+        assert manager.cleanup_old_sessions() == 0
+        assert manager.persist_dirty_sessions() == 0
+    
+    # A direct persist supersedes an eviction write still waiting in the queue
+    with tempfile.TemporaryDirectory(dir=_TMP_ROOT) as temp_dir:
+        manager = MemoryManager(storage_dir=temp_dir, max_sessions=1)
+        manager._writer = False  # hold queued writes until the writer starts below
+        manager.create_session("a").store("v", 1)
+        manager.create_session("b")
+        manager.load_session("a").store("v", 2)
+        assert manager.persist_session("a")
+        manager._writer = None
+        manager._ensure_writer()
+        manager.flush()
+        manager.sessions.clear()
+        assert manager.load_session("a").retrieve("v") == 2
+        
+        # A failed write is logged; the writer keeps going and flush() returns
+        bad_file = Path(temp_dir) / "bad.json"
+        manager._pending_writes[bad_file] = "not bytes"
+        manager._write_queue.put(bad_file)
+        manager.flush()
+        manager.create_session("c").store("v", 3)
+        assert manager.persist_dirty_sessions() == 1
+    
+    # Pickled sessions keep non-JSON value types
+    with tempfile.TemporaryDirectory(dir=_TMP_ROOT) as temp_dir:
+        manager = MemoryManager(storage_dir=temp_dir, session_format="pickle")
+        manager.create_session("raw").store("blob", b"\x00\x01", agent="travel")
+        assert manager.persist_session("raw")
+        manager.sessions.clear()
+        restored = manager.load_session("raw")
+        assert restored.retrieve("blob") == b"\x00\x01"
+        assert restored.get_by_agent("travel") == {"blob": b"\x00\x01"}
     print("✅ Memory system works")
     
     # Test credit system
@@ -201,8 +425,145 @@ def test_memory_and_credits():
     )
     assert success == True
     assert credit_manager.get_balance("test-session") == 75
+    
+    credit_manager.charge_credits(
+        "test-session", 10, TransactionType.API_CALL, "Lookup", task_id="task1", agent="travel"
+    )
+    credit_manager.refund_credits("test-session", 5, "Partial refund", task_id="task1", agent="travel")
+    summary = credit_manager.get_account_summary("test-session")
+    assert summary["total_charges"] == 35 and summary["total_refunds"] == 5
+    assert summary["spending_by_type"] == {"task_execution": 25, "api_call": 10}
+    assert credit_manager.get_spending_by_agent("test-session") == {"travel": 10}
+    
+    fresh_manager = CreditManager()
+    fresh_manager.create_account("ids", 10)
+    fresh_manager.charge_credits("ids", 1, TransactionType.API_CALL, "First")
+    transaction = fresh_manager.get_transaction_history("ids")[0]
+    assert transaction.transaction_id == "tx-000001"
+    # Non-string IDs are stored as given rather than failing in sys.intern
+    assert fresh_manager.charge_credits("ids", 1, TransactionType.API_CALL, "Second", task_id=42)
+    assert fresh_manager.refund_credits("ids", 1, "Refund", task_id=42)
     print("✅ Credit system works")
 
+def test_memory_mode_workflow():
+    """Test dispatch and compilation through the in-process queues."""
+    print("\n🧪 Testing In-Memory Dispatch...")
+    
+    from indra.router import Router
+    from indra.compiler import Compiler
+    from indra.models import Task
+    
+    with tempfile.TemporaryDirectory(dir=_TMP_ROOT) as temp_dir:
+        router = Router(
+            queue_dir=str(Path(temp_dir) / "queue"),
+            results_dir=str(Path(temp_dir) / "results"),
+            mode="memory"
+        )
+        compiler = Compiler(results_dir=str(Path(temp_dir) / "results"), completed=router.completed)
+        
+        tasks = [
+            Task(id="mem-travel", task="find_flights", worker="travel", inputs={"destination": "Tokyo"}),
+            Task(id="mem-finance", task="budget_breakdown", worker="finance", inputs={"total_budget": 3000})
+        ]
+        task_ids = [task.id for task in tasks]
+        router.dispatch_tasks(tasks)
+        
+        # No task files are materialized in memory mode
+        assert not Path(temp_dir, "queue").exists()
+        assert router.monitor_progress() == {tid: "PENDING" for tid in task_ids}
+        
+        assert router.wait_for_completion(task_ids, timeout=5)
+        assert router.state_counts() == {"PENDING": 0, "IN_PROGRESS": 0, "DONE": 2, "ERROR": 0}
+        
+        compiled_data = compiler.compile_results(task_ids)
+        assert compiled_data["completed_tasks"] == 2
+        assert _count_json(Path(temp_dir, "results")) == 0
+        print("✅ In-memory dispatch works")
+
+def test_sqlite_mode_workflow():
+    """Test that sqlite mode keeps task state in a table another router can resume."""
+    print("\n🧪 Testing SQLite Task Store...")
+    
+    from indra.router import Router
+    from indra.compiler import Compiler
+    from indra.models import Task
+    
+    with tempfile.TemporaryDirectory(dir=_TMP_ROOT) as temp_dir:
+        queue_dir = str(Path(temp_dir) / "queue")
+        results_dir = str(Path(temp_dir) / "results")
+        tasks = [
+            Task(id="sql-travel", task="find_flights", worker="travel", inputs={"destination": "Tokyo"}),
+            Task(id="sql-finance", task="budget_breakdown", worker="finance", inputs={"total_budget": 3000})
+        ]
+        task_ids = [task.id for task in tasks]
+        Router(queue_dir=queue_dir, results_dir=results_dir, mode="sqlite").dispatch_tasks(tasks)
+        
+        # A second router sees the dispatched tasks and runs them from the table
+        router = Router(queue_dir=queue_dir, results_dir=results_dir, mode="sqlite")
+        assert router.monitor_progress() == {tid: "PENDING" for tid in task_ids}
+        assert not router.is_complete(task_ids)
+        assert router.wait_for_completion(task_ids, timeout=5)
+        assert _count_json(queue_dir) == 0
+        
+        compiled_data = Compiler(results_dir=results_dir, completed=router.store).compile_results(task_ids)
+        assert compiled_data["completed_tasks"] == 2
+        print("✅ SQLite task store works")
+
+def test_dependency_scheduling():
+    """Test that tasks run in dependency order from a single execute call."""
+    print("\n🧪 Testing Dependency Scheduling...")
+    
+    from indra.router import Router
+    from indra.models import Task
+    from indra.base_worker import BaseWorker, register_worker, unregister_worker
+    
+    order = []
+    
+    @register_worker("test-ordering")
+    class OrderingWorker(BaseWorker):
+        def execute(self, **inputs):
+            order.append(inputs["step"])
+            return {"step": inputs["step"]}
+    
+    try:
+        with tempfile.TemporaryDirectory(dir=_TMP_ROOT) as temp_dir:
+            router = Router(
+                queue_dir=str(Path(temp_dir) / "queue"),
+                results_dir=str(Path(temp_dir) / "results")
+            )
+            
+            # Dispatched in reverse order on purpose
+            tasks = [
+                Task(id="dep-c", task="step", worker="test-ordering", inputs={"step": "c"}, after=["dep-a", "dep-b"]),
+                Task(id="dep-b", task="step", worker="test-ordering", inputs={"step": "b"}, after=["dep-a"]),
+                Task(id="dep-a", task="step", worker="test-ordering", inputs={"step": "a"})
+            ]
+            router.dispatch_tasks(tasks)
+            router.execute_pending_tasks()
+            
+            assert order == ["a", "b", "c"]
+            assert router.is_complete([task.id for task in tasks])
+            
+            # A router that didn't dispatch the tasks honours `after` from the task files
+            order.clear()
+            Router(queue_dir=str(Path(temp_dir) / "queue2"), results_dir=str(Path(temp_dir) / "results")).dispatch_tasks(
+                [task.model_copy(update={"id": f"disk-{task.id}", "after": [f"disk-{dep}" for dep in task.after]}) for task in tasks]
+            )
+            Router(queue_dir=str(Path(temp_dir) / "queue2"), results_dir=str(Path(temp_dir) / "results")).execute_pending_tasks()
+            assert order == ["a", "b", "c"]
+            
+            # Same for a router resuming tasks another one stored in sqlite
+            order.clear()
+            sql_kwargs = dict(queue_dir=str(Path(temp_dir) / "queue3"), results_dir=str(Path(temp_dir) / "results"), mode="sqlite")
+            Router(**sql_kwargs).dispatch_tasks(
+                [task.model_copy(update={"id": f"sql-{task.id}", "after": [f"sql-{dep}" for dep in task.after]}) for task in tasks]
+            )
+            Router(**sql_kwargs).execute_pending_tasks()
+            assert order == ["a", "b", "c"]
+            print("✅ Dependency scheduling works")
+    finally:
+        unregister_worker("test-ordering")
+
 def main():
     """Run all integration tests."""
     print("🚀 Running Integration Tests")
@@ -212,6 +573,9 @@ def main():
         test_complete_workflow()
         test_beescript_workflow()
         test_memory_and_credits()
+        test_memory_mode_workflow()
+        test_sqlite_mode_workflow()
+        test_dependency_scheduling()
         
         print("\n" + "=" * 50)
         print("🎉 ALL INTEGRATION TESTS PASSED!")
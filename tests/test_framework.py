@@ -30,6 +30,18 @@ def test_basic_functionality():
     assert task.status == TaskStatus.PENDING
     print("✅ Task creation works")
     
+    # Malformed task JSON raises JSONDecodeError, invalid tasks ValidationError
+    from pydantic import ValidationError
+    from indra.models import validate_task_json
+    for bad, error in [('[{"task": ', json.JSONDecodeError), ('[{"task": 1}]', ValidationError)]:
+        try:
+            validate_task_json(bad)
+        except error:
+            pass
+        else:
+            raise AssertionError(f"{bad!r} did not raise {error.__name__}")
+    print("✅ Task JSON errors keep their types")
+    
     # Test worker registry
     assert "travel" in WORKER_REGISTRY
     assert "finance" in WORKER_REGISTRY
@@ -42,14 +54,136 @@ def test_basic_functionality():
     assert isinstance(result, dict)
     print("✅ Worker execution works")
     
+    # Test duration parsing, including inputs without any number
+    from indra.utils import parse_duration_days
+    assert parse_duration_days("2 weeks") == 14
+    assert parse_duration_days("1 month") == 30
+    assert parse_duration_days(None) == 3
+    assert parse_duration_days("", default=5) == 5
+    
+    # Hotel nights follow the same parsing, weeks and months included
+    for duration, nights in [("5 days", 5), ("2 weeks", 14), ("1 month", 30), ("a few days", 3)]:
+        hotels = worker.execute(task="find_hotels", destination="Paris", duration=duration)
+        assert hotels["nights"] == nights
+        assert all(h["total_price"] == h["price_per_night"] * nights for h in hotels["hotels"])
+    print("✅ Duration parsing works")
+    
+    # The runtime dir is only used when it is a private directory we own
+    import os
+    from indra.paths import _private_dir
+    if hasattr(os, "getuid"):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            runtime_dir = os.path.join(temp_dir, "runtime")
+            assert _private_dir(runtime_dir) == runtime_dir
+            assert os.stat(runtime_dir).st_mode & 0o777 == 0o700
+            link = os.path.join(temp_dir, "link")
+            os.symlink(runtime_dir, link)
+            assert _private_dir(link) is None
+        print("✅ Runtime directory checks work")
+    
+    # A cached directory deleted mid-run is recreated by the next write into it
+    import shutil
+    from indra.utils import atomic_write_bytes, ensure_dir
+    with tempfile.TemporaryDirectory() as temp_dir:
+        out_dir = os.path.join(temp_dir, "out")
+        ensure_dir(out_dir)
+        shutil.rmtree(out_dir)
+        ensure_dir(out_dir)  # cached: does not recreate it
+        atomic_write_bytes(os.path.join(out_dir, "x.json"), b"{}")
+        assert os.path.exists(os.path.join(out_dir, "x.json"))
+    print("✅ Deleted directories are recreated on write")
+    
     return True
 
+def test_result_cache():
+    """Test memoization of cacheable worker outputs."""
+    from indra.base_worker import BaseWorker, register_worker, unregister_worker
+    from indra.cache import ResultCache
+    
+    calls = []
+    
+    @register_worker("test-cacheable", cacheable=True)
+    class CountingWorker(BaseWorker):
+        def execute(self, **inputs):
+            calls.append(inputs)
+            return {"echo": inputs}
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            worker = CountingWorker("test-cacheable")
+            worker.cache = ResultCache(temp_dir)
+            
+            first = worker.process_task({"id": "c-1", "inputs": {"x": 1}})
+            second = worker.process_task({"id": "c-2", "inputs": {"x": 1}})
+            worker.process_task({"id": "c-3", "inputs": {"x": 2}})
+            
+            assert first["outputs"] == second["outputs"] == {"echo": {"x": 1}}
+            assert second["task_id"] == "c-2"
+            assert len(calls) == 2
+    finally:
+        unregister_worker("test-cacheable")
+    print("✅ Result cache works")
+
+def test_worker_pool():
+    """Test parallel execution with a per-worker concurrency cap."""
+    import threading
+    import time
+    from indra.base_worker import BaseWorker, register_worker, unregister_worker
+    from indra.pool import run_tasks
+    
+    lock = threading.Lock()
+    active = []
+    peak = []
+    
+    @register_worker("test-capped")
+    class CappedWorker(BaseWorker):
+        max_concurrency = 2
+        
+        def execute(self, **inputs):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+            return {"n": inputs["n"]}
+    
+    try:
+        tasks = [{"id": f"p-{n}", "worker": "test-capped", "inputs": {"n": n}} for n in range(6)]
+        tasks.append({"id": "p-missing", "worker": "no-such-worker"})
+        outcomes = run_tasks(tasks, workers=6)
+        
+        assert [o["outputs"]["n"] for o in outcomes[:6]] == list(range(6))
+        assert isinstance(outcomes[6], KeyError)
+        assert max(peak) == 2
+        
+        # Worker instances are built once and reused across tasks
+        inits = []
+        
+        @register_worker("test-reused")
+        class ReusedWorker(BaseWorker):
+            def __init__(self, *args):
+                super().__init__(*args)
+                inits.append(1)
+            
+            def execute(self, **inputs):
+                return {}
+        
+        run_tasks([{"id": f"r-{n}", "worker": "test-reused"} for n in range(4)], workers=2)
+        assert len(inits) == 1
+    finally:
+        unregister_worker("test-capped")
+        unregister_worker("test-reused")
+    print("✅ Worker pool works")
+
 def main():
     """Run tests."""
     print("🚀 Running Indra Tests")
     print("=" * 30)
     
     if test_basic_functionality():
+        test_result_cache()
+        test_worker_pool()
         print("\n🎉 All tests passed!")
         return True
     else: